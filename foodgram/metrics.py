@@ -0,0 +1,233 @@
+"""Query counts and timings per view.
+
+MetricsMiddleware measures every request: how many SQL queries it ran,
+the time spent in the database and rendering templates, and the total
+latency. They are sent back in a Server-Timing header, added up per URL
+name for the Prometheus endpoint and checked against METRICS_BUDGETS.
+Template time includes the queries run while rendering.
+
+Totals live in the worker process, so run a single worker per scraped
+address, as the gunicorn default does.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float('inf'))
+
+# What METRICS_BUDGETS may limit, see Timings.over_budget().
+BUDGETS = ('queries', 'db', 'template', 'total')
+
+current = ContextVar('timings', default=None)
+
+
+class Timings:
+    """What a single request spent, times in seconds.
+
+    Also an execute wrapper counting and timing the queries it runs.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += perf_counter() - started
+
+    def stop(self):
+        self.total = perf_counter() - self.started
+
+    def header(self):
+        return (f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'tpl;dur={self.template * 1000:.1f}, '
+                f'total;dur={self.total * 1000:.1f}')
+
+    def over_budget(self, budget):
+        """Spent and allowed amounts of each exceeded budget.
+
+        Budgets count queries and milliseconds.
+        """
+        spent = {
+            'queries': self.queries,
+            'db': self.db * 1000,
+            'template': self.template * 1000,
+            'total': self.total * 1000,
+        }
+        return {name: (spent[name], limit) for name, limit in budget.items()
+                if spent[name] > limit}
+
+
+class Registry:
+    """Totals per view since the process started."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, timings):
+        with self.lock:
+            stats = self.views.setdefault(view, {
+                'requests': 0, 'queries': 0, 'db': 0.0, 'template': 0.0,
+                'total': 0.0, 'buckets': [0] * len(BUCKETS),
+            })
+            stats['requests'] += 1
+            stats['queries'] += timings.queries
+            stats['db'] += timings.db
+            stats['template'] += timings.template
+            stats['total'] += timings.total
+            for index, bound in enumerate(BUCKETS):
+                if timings.total <= bound:
+                    stats['buckets'][index] += 1
+
+    def render(self):
+        """The totals in the Prometheus text exposition format."""
+        with self.lock:
+            views = {view: dict(stats, buckets=list(stats['buckets']))
+                     for view, stats in sorted(self.views.items())}
+        lines = []
+        for name, key, kind, help_text in (
+            ('requests_total', 'requests', 'counter', 'Requests served.'),
+            ('db_queries_total', 'queries', 'counter', 'SQL queries run.'),
+            ('db_seconds_total', 'db', 'counter',
+             'Time spent running SQL queries.'),
+            ('template_seconds_total', 'template', 'counter',
+             'Time spent rendering templates.'),
+        ):
+            lines += [f'# HELP foodgram_{name} {help_text}',
+                      f'# TYPE foodgram_{name} {kind}']
+            lines += [f'foodgram_{name}{{view="{view}"}} {stats[key]}'
+                      for view, stats in views.items()]
+        lines += ['# HELP foodgram_request_seconds Request latency.',
+                  '# TYPE foodgram_request_seconds histogram']
+        for view, stats in views.items():
+            for bound, count in zip(BUCKETS, stats['buckets']):
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'foodgram_request_seconds_bucket'
+                             f'{{view="{view}",le="{le}"}} {count}')
+            lines += [
+                f'foodgram_request_seconds_sum{{view="{view}"}} '
+                f'{stats["total"]}',
+                f'foodgram_request_seconds_count{{view="{view}"}} '
+                f'{stats["requests"]}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+@contextmanager
+def measure(timings):
+    token = current.set(timings)
+    wrappers = [connection.execute_wrappers
+                for connection in connections.all()]
+    for stack in wrappers:
+        stack.append(timings)
+    try:
+        yield
+    finally:
+        for stack in wrappers:
+            stack.remove(timings)
+        current.reset(token)
+
+
+class MetricsMiddleware:
+    """Measure requests when METRICS_ENABLED is set.
+
+    Otherwise Django drops the middleware when it starts and requests
+    pay nothing for it.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        for view, budget in settings.METRICS_BUDGETS.items():
+            unknown = set(budget) - set(BUDGETS)
+            if unknown:
+                raise ImproperlyConfigured(
+                    f'METRICS_BUDGETS[{view!r}] has unknown budgets '
+                    f'{", ".join(sorted(unknown))}, expected some of '
+                    f'{", ".join(BUDGETS)}'
+                )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = Timings()
+        with measure(timings):
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        timings.stop()
+        response['Server-Timing'] = timings.header()
+        if response.streaming:
+            # The header can only tell the time to the first byte, the
+            # totals wait for the last one.
+            response.streaming_content = self.stream(
+                response.streaming_content, view, timings
+            )
+        else:
+            self.record(view, timings)
+        return response
+
+    def stream(self, content, view, timings):
+        with measure(timings):
+            yield from content
+        timings.stop()
+        self.record(view, timings)
+
+    def record(self, view, timings):
+        registry.record(view, timings)
+        exceeded = timings.over_budget(settings.METRICS_BUDGETS.get(view, {}))
+        if exceeded:
+            logger.warning('%s is over budget: %s', view, ', '.join(
+                f'{name} {spent:.0f} > {limit}'
+                for name, (spent, limit) in exceeded.items()
+            ))
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current.get()
+        if timings is None:
+            return super().render(context, request)
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django templates adding their render time to the request timings.
+
+    Only the templates views render are timed, the ones they include
+    are part of that time.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name),
+                                 self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
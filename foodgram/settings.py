@@ -14,8 +14,8 @@ ALLOWED_HOSTS = ['*']
 
 
 INSTALLED_APPS = [
-    'recipes',
-    'users',
+    'recipes.apps.RecipesConfig',
+    'users.apps.UsersConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +52,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.context_processors.cart',
             ],
         },
     },
@@ -70,6 +72,44 @@ DATABASES = {
     }
 }
 
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ.get(
+                'CACHE_BACKEND',
+                'django.core.cache.backends.locmem.LocMemCache'
+            ),
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'foodgram'),
+        }
+    }
+
+# With Redis, sessions are read from the cache and only written through
+# to the database when they change. A per-process cache such as locmem
+# would serve each worker its own stale copy of a session, e.g. a
+# shopping list that was already emptied elsewhere, so the database is
+# read directly then.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL
+    else 'django.contrib.sessions.backends.db'
+)
+
+THUMBNAIL_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+THUMBNAIL_CACHE = 'default'
+THUMBNAIL_QUALITY = 85
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -131,3 +171,54 @@ TAGS_CLASSES = {
 }
 
 PAGINATOR_NUM_PER_PAGE = 6
+
+RECIPE_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+POPULARITY_HALF_LIFE_DAYS = 7
+
+TIMELINE_LENGTH = 500
+TIMELINE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_THUMBNAIL_SIZES = {
+    'card': '361x240',
+    'author_card': '72x72',
+    'shop_list': '250x250',
+    'single_page': '480x480',
+}
+RECIPE_THUMBNAIL_SCALES = [0.5, 1, 2]
+RECIPE_THUMBNAIL_FORMATS = ['WEBP']
+# Pillow writes AVIF once pillow-avif-plugin is imported, without it the
+# flag is ignored.
+if os.environ.get('RECIPE_THUMBNAIL_AVIF'):
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        RECIPE_THUMBNAIL_FORMATS.insert(0, 'AVIF')
+RECIPE_THUMBNAIL_WORKERS = int(os.environ.get('RECIPE_THUMBNAIL_WORKERS', 2))
+
+INGREDIENTS_AUTOCOMPLETE_LIMIT = 20
+INGREDIENTS_INDEX_ENABLED = True
+INGREDIENTS_INDEX_TTL = 300
+
+SHOPPING_LIST_PDF_FONT = os.environ.get(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Query counts and timings per view, see foodgram/metrics.py. Budgets
+# are keyed by URL name and count queries and milliseconds.
+METRICS_ENABLED = bool(os.environ.get('METRICS_ENABLED'))
+METRICS_BUDGETS = {
+    'index': {'queries': 5, 'total': 300},
+    'feed': {'queries': 6, 'total': 300},
+    'favorites': {'queries': 6, 'total': 300},
+    'subscriptions': {'queries': 8, 'total': 300},
+    'profile': {'queries': 8, 'total': 300},
+    'recipe': {'queries': 10, 'total': 300},
+    'list_ingredients': {'queries': 2, 'total': 100},
+    'download_purchases': {'queries': 4, 'total': 1000},
+}
+if METRICS_ENABLED:
+    TEMPLATES[0]['BACKEND'] = 'foodgram.metrics.TimedDjangoTemplates'
@@ -0,0 +1,31 @@
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+
+from .metrics import MetricsMiddleware, Timings
+
+
+def get_response(request):
+    return HttpResponse()
+
+
+class MetricsMiddlewareTest(SimpleTestCase):
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(get_response)
+
+    @override_settings(METRICS_ENABLED=True,
+                       METRICS_BUDGETS={'index': {'queries': 5, 'db': 50}})
+    def test_budgets(self):
+        MetricsMiddleware(get_response)
+        timings = Timings()
+        timings.queries, timings.db = 6, 0.01
+        self.assertEqual(timings.over_budget({'queries': 5, 'db': 50}),
+                         {'queries': (6, 5)})
+
+    @override_settings(METRICS_ENABLED=True,
+                       METRICS_BUDGETS={'index': {'querys': 5}})
+    def test_unknown_budget(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'querys'):
+            MetricsMiddleware(get_response)
@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from . import views
+
 urlpatterns = [
     path('', include('users.urls')),
     path('', include('django.contrib.auth.urls')),
@@ -10,6 +12,9 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 ]
 
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics/', views.metrics, name='metrics'))
+
 handler404 = 'recipes.views.page_not_found'
 handler500 = 'recipes.views.server_error'
 
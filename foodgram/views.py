@@ -1,7 +1,10 @@
+from django.http import HttpResponse
 from django.shortcuts import render
 
 from http import HTTPStatus
 
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     return render(request,
@@ -13,3 +16,8 @@ def server_error(request):
     return render(request,
                   'misc/500.html',
                   status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def metrics(request):
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
@@ -1,9 +1,8 @@
 from django.contrib import admin
-
-
-from users.models import Favorite
+from django.db.models import Q
 
 from .models import TAGS, Ingredient, Recipe, RecipeIngredient
+from .search import update_search_vector
 
 
 class TagFilter(admin.SimpleListFilter):
@@ -15,7 +14,7 @@ class TagFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value():
-            return queryset.filter(tags__icontains=self.value())
+            return queryset.with_tags([self.value()])
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -31,8 +30,20 @@ class RecipeAdmin(admin.ModelAdmin):
         RecipeIngredientInline,
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        matches = queryset.search(search_term).values('pk')
+        return queryset.filter(
+            Q(pk__in=matches) | Q(author__username__icontains=search_term)
+        ), False
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_vector([form.instance.pk])
+
     def likes(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
     likes.short_description = 'Добавили в избранное'
 
 
@@ -0,0 +1,73 @@
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from time import monotonic
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Ingredient, normalize_title
+
+
+class IngredientIndex:
+    """Sorted in-process copy of the ingredient catalogue.
+
+    Prefix lookups are two bisections over the normalized titles. The
+    index is dropped when an ingredient is saved or deleted in this
+    process and rebuilt after ``ttl`` seconds so other workers pick up
+    changes made elsewhere.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._built = 0
+
+    def invalidate(self):
+        self._data = None
+
+    def _load(self):
+        with self._lock:
+            if self._data is None or monotonic() - self._built > self.ttl:
+                entries = sorted(Ingredient.objects.values_list(
+                    'normalized_title', 'title', 'dimension'
+                ))
+                self._data = ([entry[0] for entry in entries], entries)
+                self._built = monotonic()
+            return self._data
+
+    def search(self, query, limit):
+        data = self._data
+        if data is None or monotonic() - self._built > self.ttl:
+            data = self._load()
+        keys, entries = data
+        query = normalize_title(query)
+        start = bisect_left(keys, query)
+        end = bisect_right(keys, query + '\U0010ffff', lo=start)
+        ranked = heapq.nsmallest(
+            limit, entries[start:end],
+            key=lambda entry: (entry[0] != query, len(entry[0]), entry[0])
+        )
+        return [{'title': title, 'dimension': dimension}
+                for key, title, dimension in ranked]
+
+
+ingredient_index = IngredientIndex(ttl=settings.INGREDIENTS_INDEX_TTL)
+
+
+def search_ingredients(query, limit=settings.INGREDIENTS_AUTOCOMPLETE_LIMIT):
+    if settings.INGREDIENTS_INDEX_ENABLED:
+        return ingredient_index.search(query, limit)
+    return list(
+        Ingredient.objects.filter(
+            normalized_title__startswith=normalize_title(query)
+        ).values('title', 'dimension')[:limit]
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
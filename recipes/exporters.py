@@ -0,0 +1,113 @@
+import csv
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+EXPORTERS = {}
+
+TITLE = 'Shopping list by Foodgram'
+
+
+def register(name):
+    def wrapper(cls):
+        EXPORTERS[name] = cls
+        return cls
+    return wrapper
+
+
+class Exporter(ABC):
+    """Iterable body of a shopping list download.
+
+    ``items`` yields ``(title, dimension, amount)`` rows and is consumed
+    once, while the response is being streamed.
+    """
+    content_type = None
+    extension = None
+
+    def __init__(self, items):
+        self.items = items
+
+    @abstractmethod
+    def __iter__(self):
+        """Yield the chunks of the file, str or bytes."""
+
+
+@register('txt')
+class TextExporter(Exporter):
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def __iter__(self):
+        yield f'{TITLE}\n\n'
+        for title, dimension, amount in self.items:
+            yield f'{title.capitalize()} - {amount}{dimension}\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+@register('csv')
+class CsvExporter(Exporter):
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def __iter__(self):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(('Ингредиент', 'Количество', 'Единицы'))
+        for title, dimension, amount in self.items:
+            yield writer.writerow((title.capitalize(), amount, dimension))
+
+
+@register('pdf')
+class PdfExporter(Exporter):
+    """Shopping list as a PDF document.
+
+    Unlike the text formats, the document is built fully in memory and
+    only then streamed in chunks, since reportlab writes the
+    cross-reference table at the end. Its size grows with the number of
+    distinct ingredients, not with the number of recipes.
+    """
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+    chunk_size = 64 * 1024
+
+    def __init__(self, items):
+        super().__init__(items)
+        # Fail before the response starts rather than in the middle of
+        # the stream, e.g. when SHOPPING_LIST_PDF_FONT does not exist.
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT)
+            )
+
+    def __iter__(self):
+        buffer = BytesIO()
+        page = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - self.margin
+        page.setFont(self.font_name, self.font_size + 4)
+        page.drawString(self.margin, y, TITLE)
+        y -= self.font_size * 3
+        page.setFont(self.font_name, self.font_size)
+        for title, dimension, amount in self.items:
+            if y < self.margin:
+                page.showPage()
+                page.setFont(self.font_name, self.font_size)
+                y = height - self.margin
+            page.drawString(self.margin, y,
+                            f'{title.capitalize()} - {amount} {dimension}')
+            y -= self.font_size * 1.5
+        page.save()
+        data = buffer.getbuffer()
+        for start in range(0, len(data), self.chunk_size):
+            yield bytes(data[start:start + self.chunk_size])
@@ -0,0 +1,92 @@
+from django import forms
+from django.db import models
+from django.utils.text import capfirst
+
+
+class TagsField(models.PositiveSmallIntegerField):
+    """Set of tags stored as a bitmask, one bit per choice.
+
+    Python code sees a list of tag names, the database sees an integer,
+    so filtering by tags is an IN lookup over the possible masks.
+    """
+
+    def __init__(self, *args, tag_choices=(), **kwargs):
+        self.tag_choices = tuple(tag_choices)
+        self.bits = {
+            value: 1 << i for i, (value, label) in enumerate(self.tag_choices)
+        }
+        kwargs.setdefault('default', list)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['tag_choices'] = self.tag_choices
+        return name, path, args, kwargs
+
+    @property
+    def validators(self):
+        # The integer range validators would compare the list of tags
+        # with the bounds of the column, every mask of known tags fits.
+        return list(self._validators)
+
+    def to_mask(self, tags):
+        mask = 0
+        for tag in tags:
+            mask |= self.bits[tag]
+        return mask
+
+    def from_mask(self, mask):
+        return [tag for tag, bit in self.bits.items() if mask & bit]
+
+    def masks_matching(self, tags):
+        """All masks that share at least one tag with ``tags``."""
+        mask = self.to_mask(tags)
+        return [m for m in range(1 << len(self.bits)) if m & mask]
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return []
+        return self.from_mask(value)
+
+    def to_python(self, value):
+        if value is None:
+            return []
+        if isinstance(value, int):
+            return self.from_mask(value)
+        if isinstance(value, str):
+            return [tag for tag in value.split(',') if tag]
+        return list(value)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        return self.to_mask(self.to_python(value))
+
+    def value_to_string(self, obj):
+        return ','.join(self.value_from_object(obj))
+
+    def validate(self, value, model_instance):
+        for tag in value:
+            if tag not in self.bits:
+                raise forms.ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': tag},
+                )
+        if not value and not self.blank:
+            raise forms.ValidationError(self.error_messages['blank'],
+                                        code='blank')
+
+    def formfield(self, **kwargs):
+        defaults = {
+            'choices': self.tag_choices,
+            'required': not self.blank,
+            'label': capfirst(self.verbose_name),
+            'help_text': self.help_text,
+        }
+        defaults.update(kwargs)
+        # The admin passes its number input to every IntegerField.
+        widget = defaults.get('widget')
+        if widget and not getattr(widget, 'allow_multiple_selected', False):
+            del defaults['widget']
+        return forms.MultipleChoiceField(**defaults)
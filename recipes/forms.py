@@ -1,9 +1,8 @@
 from django import forms
+from django.db import transaction
 
-from django.shortcuts import get_object_or_404, redirect, render
-from pytils.translit import slugify
-
-from .models import Recipe, RecipeIngredient, Ingredient
+from .models import Ingredient, Recipe, RecipeIngredient, normalize_title
+from .search import update_search_vector
 
 
 class RecipeForm(forms.ModelForm):
@@ -27,3 +26,58 @@ class RecipeForm(forms.ModelForm):
         return [value for value, label in self.fields['tags'].choices
                 if value in self['tags'].value()]
 
+    def clean(self):
+        cleaned_data = super().clean()
+        self.ingredients = self.resolve_ingredients()
+        return cleaned_data
+
+    def resolve_ingredients(self):
+        """Resolve the posted ingredient rows with a single query.
+
+        Returns a list of ``(ingredient, amount)`` pairs, amounts of
+        repeated ingredients are summed up.
+        """
+        names = self.data.getlist('nameIngredient')
+        values = self.data.getlist('valueIngredient')
+        units = self.data.getlist('unitsIngredient')
+        if not len(names) == len(units) == len(values) != 0:
+            raise forms.ValidationError('Добавьте ингредиентов')
+        try:
+            amounts = [int(value) for value in values]
+        except ValueError:
+            amounts = [-1]
+        if min(amounts) < 0:
+            raise forms.ValidationError(
+                'Значение должно быть больше или равно 0.'
+            )
+
+        titles = [normalize_title(name) for name in names]
+        catalogue = {
+            (item.normalized_title, item.dimension): item
+            for item in Ingredient.objects.filter(
+                normalized_title__in=set(titles)
+            )
+        }
+        ingredients = {}
+        for name, title, unit, amount in zip(names, titles, units, amounts):
+            ingredient = catalogue.get((title, unit))
+            if ingredient is None:
+                raise forms.ValidationError(
+                    f'Ингредиент не найден: {name}, {unit}'
+                )
+            ingredients[ingredient] = ingredients.get(ingredient, 0) + amount
+        return list(ingredients.items())
+
+    @transaction.atomic
+    def save(self):
+        created = self.instance._state.adding
+        recipe = super().save()
+        if not created:
+            RecipeIngredient.objects.filter(recipe=recipe).delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in self.ingredients
+        )
+        update_search_vector([recipe.pk])
+        return recipe
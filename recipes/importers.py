@@ -0,0 +1,102 @@
+import io
+import json
+import zipfile
+from contextlib import contextmanager
+from time import monotonic
+
+WHITESPACE = ' \t\n\r'
+
+
+@contextmanager
+def open_text(path, member=None):
+    """Open ``path`` as text, reading a member of it if it is a zip file.
+
+    Without ``member`` the first JSON member of the archive is read,
+    failing that the first CSV one. Yields the stream and its file name.
+    """
+    if not zipfile.is_zipfile(path):
+        with open(path, encoding='utf-8') as stream:
+            yield stream, path
+        return
+    with zipfile.ZipFile(path) as archive:
+        if member is None:
+            names = sorted(
+                (name for name in archive.namelist()
+                 if name.endswith(('.json', '.csv'))),
+                key=lambda name: not name.endswith('.json')
+            )
+            if not names:
+                raise ValueError(f'No JSON or CSV file in {path}')
+            member = names[0]
+        with archive.open(member) as raw:
+            yield io.TextIOWrapper(raw, encoding='utf-8'), member
+
+
+def iter_json_array(stream, chunk_size=64 * 1024):
+    """Yield the items of a top-level JSON array one by one.
+
+    Only about ``chunk_size`` characters of the document are held in
+    memory besides the item being decoded.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    # What comes next: '[', the first item or ']', a ',' or ']' after an
+    # item, an item after a ',', or only whitespace after the ']'.
+    expect = 'open'
+    while True:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        if pos < len(buffer):
+            char = buffer[pos]
+            if expect == 'end':
+                raise ValueError('Extra data after the JSON array')
+            if expect == 'open':
+                if char != '[':
+                    raise ValueError('Expected a JSON array')
+                expect, pos = 'first', pos + 1
+                continue
+            if expect == 'separator' or (expect == 'first' and char == ']'):
+                if char == ']':
+                    expect, pos = 'end', pos + 1
+                    continue
+                if char != ',':
+                    raise ValueError(f'Expected , or ] instead of {char!r}')
+                expect, pos = 'item', pos + 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            if end is not None:
+                after = end
+                while after < len(buffer) and buffer[after] in WHITESPACE:
+                    after += 1
+                # Anything but a separator after the item means that it
+                # was cut short by the end of the buffer, e.g. "1." of
+                # "1.5", or that the document is malformed.
+                if after < len(buffer) and buffer[after] in ',]':
+                    yield item
+                    expect, pos = 'separator', end
+                    continue
+        if eof:
+            if expect == 'end':
+                return
+            raise ValueError('Truncated or malformed JSON array')
+        chunk = stream.read(chunk_size)
+        buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+
+
+class Progress:
+    """Running row count and throughput of an import."""
+
+    def __init__(self):
+        self.started = monotonic()
+        self.count = 0
+
+    def add(self, count):
+        self.count += count
+
+    def __str__(self):
+        elapsed = monotonic() - self.started
+        rate = self.count / elapsed if elapsed else 0
+        return f'{self.count} rows in {elapsed:.1f}s ({rate:.0f} rows/s)'
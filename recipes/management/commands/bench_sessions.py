@@ -0,0 +1,76 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Count session writes per page view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=20,
+                            help='Page views per page and visitor')
+        parser.add_argument('--username',
+                            help='Also browse as this user')
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.select_related('author').first()
+        if recipe is None:
+            raise CommandError('Add a recipe to browse first')
+        pages = [reverse('index'), reverse('index') + '?sort=popular',
+                 reverse('recipe', args=[recipe.author, recipe.slug]),
+                 reverse('profile', args=[recipe.author])]
+        # A cookieless visitor, e.g. a crawler, starts a new session on
+        # every request.
+        visitors = [('anonymous', None, True), ('cookieless', None, False)]
+        if options['username']:
+            user = get_user_model().objects.get(
+                username=options['username']
+            )
+            pages += [reverse('favorites'), reverse('subscriptions'),
+                      reverse('feed'), reverse('purchases')]
+            visitors.append((user.username, user, True))
+
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        save = store.save
+        writes = []
+
+        def counting_save(session, *args, **kwargs):
+            writes.append(session)
+            return save(session, *args, **kwargs)
+
+        store.save = counting_save
+        try:
+            with transaction.atomic():
+                for name, user, cookies in visitors:
+                    self.browse(name, user, cookies, pages,
+                                options['views'], writes)
+                transaction.set_rollback(True)
+        finally:
+            store.save = save
+
+    def browse(self, name, user, cookies, pages, views, writes):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        total = 0
+        for page in pages:
+            writes.clear()
+            for _ in range(views):
+                if not cookies:
+                    client = Client()
+                client.get(page)
+            total += len(writes)
+            self.stdout.write(
+                f'{name:12} {page:40} {len(writes) / views:.2f} writes/view'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{name:12} {"total":40} '
+            f'{total / (views * len(pages)):.2f} writes/view'
+        ))
@@ -0,0 +1,276 @@
+import json
+import math
+import platform
+import random
+import subprocess
+from io import StringIO
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils import timezone
+
+from foodgram.metrics import Timings
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeScore
+from recipes.search import update_search_vector
+from users.models import Favorite, Follow, ShoppingCart
+
+SCENARIOS = ('index', 'favorites', 'subscriptions', 'recipe',
+             'autocomplete', 'add_favorite', 'download')
+
+LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',
+                'django.core.cache.backends.dummy.DummyCache')
+
+
+def percentile(latencies, fraction):
+    """Nearest-rank percentile of sorted ``latencies``."""
+    return latencies[max(math.ceil(fraction * len(latencies)) - 1, 0)]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway test database with a synthetic dataset and '
+            'measure the latency of the main pages and JSON endpoints')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=20,
+                            help='Untimed requests before each scenario')
+        parser.add_argument('--scenario', action='append',
+                            choices=SCENARIOS,
+                            help='Run only these scenarios')
+        parser.add_argument('--ingredients',
+                            default=str(settings.BASE_DIR
+                                        / 'ingredients.json'),
+                            help='Ingredient catalogue to seed from')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare',
+                            help='Results of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        """Everything runs in a test database created for the run and
+        dropped afterwards, next to the one in DATABASES, like the test
+        runner does: an in-memory one on SQLite, test_<NAME> on
+        PostgreSQL. The cache is used as configured, so it has to be
+        local to the process.
+        """
+        backend = settings.CACHES['default']['BACKEND']
+        if backend not in LOCAL_CACHES:
+            raise CommandError(f'The benchmark would write to the shared '
+                               f'{backend} cache, run it without REDIS_URL')
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                previous = json.load(stream)['results']
+        self.rng = random.Random(options['seed'])
+
+        old_config = setup_databases(verbosity=0, interactive=False,
+                                     aliases={'default'})
+        try:
+            started = perf_counter()
+            dataset = self.seed(options)
+            self.stdout.write(f'Seeded in {perf_counter() - started:.1f}s: '
+                              f'{dataset}')
+            results = {
+                name: self.run(name, options['requests'], options['warmup'])
+                for name in options['scenario'] or SCENARIOS
+            }
+            database = connection.vendor
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        report = {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'database': database,
+            'debug': settings.DEBUG,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': dataset,
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, indent=2)
+        self.report(results, previous)
+        self.stdout.write(self.style.SUCCESS(
+            f'Results written to {options["output"]}'
+        ))
+
+    def seed(self, options):
+        rng = self.rng
+        call_command('import_ingredients', options['ingredients'],
+                     stdout=StringIO())
+        ingredients = list(Ingredient.objects.values_list('pk', 'title'))
+        if not ingredients:
+            raise CommandError('The ingredient catalogue is empty')
+
+        password = make_password('benchmark')
+        User = get_user_model()
+        User.objects.bulk_create(
+            User(username=f'user{i}', password=password,
+                 first_name='Имя', last_name=f'Фамилия {i}')
+            for i in range(max(options['users'], 2))
+        )
+        # Only PostgreSQL sets the primary keys of bulk created rows.
+        user_ids = list(User.objects.order_by('pk')
+                        .values_list('pk', flat=True))
+        # A few authors write most of the recipes and a few recipes get
+        # most of the favorites, as on a real site.
+        author_weights = [1 / rank for rank in range(1, len(user_ids) + 1)]
+        authors = rng.choices(user_ids, author_weights, k=options['recipes'])
+        Recipe.objects.bulk_create(
+            Recipe(name=f'{rng.choice(ingredients)[1][:60]} №{i}',
+                   slug=f'recipe-{i}', author_id=author,
+                   tags=rng.sample(settings.TAGS, rng.randint(1, 3)),
+                   cooking_time=rng.randint(5, 120),
+                   description='Описание рецепта')
+            for i, author in enumerate(authors)
+        )
+        recipe_ids = list(Recipe.objects.order_by('pk')
+                          .values_list('pk', flat=True))
+        RecipeIngredient.objects.bulk_create(
+            (RecipeIngredient(recipe_id=recipe_id, ingredient_id=pk,
+                              amount=rng.randint(1, 500))
+             for recipe_id in recipe_ids
+             for pk, title in rng.sample(ingredients, rng.randint(3, 12))),
+            batch_size=1000,
+        )
+
+        follows = {(user_id, author)
+                   for user_id in user_ids
+                   for author in rng.choices(user_ids, author_weights, k=10)
+                   if author != user_id}
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author)
+             for user_id, author in follows), batch_size=1000,
+        )
+        recipe_weights = [1 / rank for rank in range(1, len(recipe_ids) + 1)]
+        favorites = {(user_id, recipe_id)
+                     for user_id in user_ids
+                     for recipe_id in rng.choices(recipe_ids, recipe_weights,
+                                                  k=20)}
+        Favorite.objects.bulk_create(
+            (Favorite(user_id=user_id, recipe_id=recipe_id)
+             for user_id, recipe_id in favorites), batch_size=1000,
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user_id=user_ids[0], recipe_id=recipe_id)
+            for recipe_id in rng.sample(recipe_ids, min(10, len(recipe_ids)))
+        )
+        update_search_vector(recipe_ids)
+        RecipeScore.objects.bulk_create(
+            (RecipeScore(recipe_id=recipe_id) for recipe_id in recipe_ids),
+            batch_size=1000,
+        )
+        call_command('recount', stdout=StringIO())
+
+        self.user = User.objects.get(pk=user_ids[0])
+        self.recipes = list(
+            Recipe.objects.values_list('author__username', 'slug', 'pk')
+        )
+        self.prefixes = [title[:rng.randint(2, 4)]
+                         for pk, title in rng.sample(ingredients,
+                                                     min(100,
+                                                         len(ingredients)))]
+        return {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'ingredients': len(ingredients),
+            'recipe_ingredients': RecipeIngredient.objects.count(),
+            'follows': len(follows),
+            'favorites': len(favorites),
+        }
+
+    def run(self, name, requests, warmup):
+        client = Client()
+        client.force_login(self.user)
+        send = getattr(self, f'request_{name}')
+        latencies = []
+        counter = Timings()
+        with connection.execute_wrapper(counter):
+            for number in range(warmup + requests):
+                if number == warmup:
+                    counter.queries = 0
+                started = perf_counter()
+                response = send(client)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = perf_counter() - started
+                if response.status_code >= 400:
+                    raise CommandError(f'{name} answered with '
+                                       f'{response.status_code}')
+                if number >= warmup:
+                    latencies.append(elapsed)
+        latencies.sort()
+        return {
+            'requests': requests,
+            'throughput': requests / sum(latencies),
+            'mean_ms': sum(latencies) / requests * 1000,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries': counter.queries / requests,
+        }
+
+    def request_index(self, client):
+        return client.get(reverse('index'))
+
+    def request_favorites(self, client):
+        return client.get(reverse('favorites'))
+
+    def request_subscriptions(self, client):
+        return client.get(reverse('subscriptions'))
+
+    def request_recipe(self, client):
+        username, slug, pk = self.rng.choice(self.recipes)
+        return client.get(reverse('recipe', args=[username, slug]))
+
+    def request_autocomplete(self, client):
+        return client.get(reverse('list_ingredients'),
+                          {'query': self.rng.choice(self.prefixes)})
+
+    def request_add_favorite(self, client):
+        username, slug, pk = self.rng.choice(self.recipes)
+        return client.post(reverse('favorites'), json.dumps({'id': pk}),
+                           content_type='application/json')
+
+    def request_download(self, client):
+        return client.get(reverse('download_purchases'))
+
+    def report(self, results, previous):
+        self.stdout.write(f'{"scenario":15} {"req/s":>8} {"p50 ms":>8} '
+                          f'{"p99 ms":>8} {"queries":>8}')
+        for name, result in results.items():
+            line = (f'{name:15} {result["throughput"]:8.1f} '
+                    f'{result["p50_ms"]:8.1f} {result["p99_ms"]:8.1f} '
+                    f'{result["queries"]:8.1f}')
+            if previous and name in previous:
+                before = previous[name]
+                line += '   ' + ', '.join(
+                    f'{key} {self.change(before[key], result[key])}'
+                    for key in ('p50_ms', 'p99_ms', 'queries')
+                )
+            self.stdout.write(line)
+
+    def change(self, before, after):
+        return f'{(after - before) / before * 100:+.0f}%' if before else 'n/a'
@@ -0,0 +1,108 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient, Recipe
+from recipes.paginators import KeysetPaginator
+
+
+def seq_scans(plan):
+    """Tables read with a sequential scan anywhere in an EXPLAIN plan."""
+    tables = []
+    if plan['Node Type'] == 'Seq Scan':
+        tables.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        tables += seq_scans(child)
+    return tables
+
+
+class Command(BaseCommand):
+    help = ('Browse the main pages and check with EXPLAIN that every '
+            'query they run can be answered from an index (PostgreSQL)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username',
+                            help='Also browse the pages of this user')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN checks need PostgreSQL')
+        recipe = (Recipe.objects.select_related('author')
+                  .filter(ingredients__isnull=False).first())
+        if recipe is None:
+            raise CommandError('Add a recipe with ingredients first')
+        cursor = KeysetPaginator(
+            Recipe.objects.all(), settings.PAGINATOR_NUM_PER_PAGE
+        ).get_page(None).next_cursor
+        ingredient = recipe.ingredients.select_related('ingredient').first()
+        # Pages with the tables they may read in full: autocomplete loads
+        # the whole catalogue into its in-process index on purpose.
+        pages = [
+            (reverse('index'), ()),
+            (reverse('index') + f'?cursor={cursor or ""}', ()),
+            (reverse('index') + '?sort=popular', ()),
+            (reverse('index') + f'?q={recipe.name.split()[0]}', ()),
+            (reverse('recipe', args=[recipe.author, recipe.slug]), ()),
+            (reverse('profile', args=[recipe.author]), ()),
+            (reverse('cook') + f'?ingredient={ingredient.ingredient_id}',
+             ()),
+            (reverse('list_ingredients')
+             + f'?query={ingredient.ingredient.normalized_title[:2]}',
+             (Ingredient._meta.db_table,)),
+        ]
+        client = Client()
+        if options['username']:
+            client.force_login(get_user_model().objects.get(
+                username=options['username']
+            ))
+            client.post(reverse('purchases'), json.dumps({'id': recipe.pk}),
+                        content_type='application/json')
+            pages += [(reverse(name), ()) for name in (
+                'favorites', 'subscriptions', 'feed', 'purchases',
+                'download_purchases',
+            )]
+
+        failures = 0
+        with transaction.atomic():
+            # With sequential scans priced out, one only shows up in a
+            # plan when no index can serve the query, whatever the size
+            # of the tables.
+            with connection.cursor() as db:
+                db.execute('SET LOCAL enable_seqscan = off')
+            ingredient_index.invalidate()
+            for page, full_reads in pages:
+                failures += self.explain_page(client, page, full_reads)
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f'{failures} queries need a sequential scan')
+        self.stdout.write(self.style.SUCCESS('All queries use indexes'))
+
+    def explain_page(self, client, page, full_reads):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(page)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].lstrip().upper().startswith('SELECT')]
+        failures = 0
+        with connection.cursor() as db:
+            for sql in selects:
+                db.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = db.fetchone()[0][0]['Plan']
+                tables = [table for table in seq_scans(plan)
+                          if table not in full_reads]
+                if tables:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'{page}: seq scan on {", ".join(tables)}\n'
+                        f'    {sql[:300]}'
+                    ))
+        self.stdout.write(f'{page:40} {len(selects)} queries checked')
+        return failures
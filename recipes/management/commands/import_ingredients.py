@@ -0,0 +1,67 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importers import Progress, iter_json_array, open_text
+from recipes.models import Ingredient, normalize_title
+
+
+class Command(BaseCommand):
+    help = ('Import the ingredient catalogue from a JSON or CSV file, or '
+            'from a zip archive holding one')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='ingredients.json, .csv or .zip')
+        parser.add_argument('--member', help='File to read from the archive')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        seen = set(Ingredient.objects.values_list('normalized_title',
+                                                  'dimension'))
+        batch_size = options['batch_size']
+        batch = []
+        progress = Progress()
+        skipped = 0
+        source = open_text(options['path'], options['member'])
+        try:
+            with source as (stream, name):
+                for title, dimension in self.read(stream, name):
+                    progress.add(1)
+                    title, dimension = title.strip(), dimension.strip()
+                    key = (normalize_title(title), dimension)
+                    if key in seen:
+                        skipped += 1
+                        continue
+                    seen.add(key)
+                    batch.append(Ingredient(title=title,
+                                            normalized_title=key[0],
+                                            dimension=dimension))
+                    if len(batch) >= batch_size:
+                        self.save(batch, progress)
+                        batch = []
+        except (OSError, KeyError, IndexError, ValueError) as error:
+            raise CommandError(error)
+        self.save(batch, progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {progress}, {progress.count - skipped} new, '
+            f'{skipped} duplicates'
+        ))
+
+    def read(self, stream, name):
+        if name.endswith('.csv'):
+            for row in csv.reader(stream):
+                if row:
+                    yield row[0], row[1]
+            return
+        for item in iter_json_array(stream):
+            model = item.get('model', 'recipes.ingredient').lower()
+            if model != 'recipes.ingredient':
+                continue
+            fields = item.get('fields', item)
+            yield fields['title'], fields['dimension']
+
+    def save(self, batch, progress):
+        if not batch:
+            return
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Read {progress}')
@@ -0,0 +1,188 @@
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from recipes.importers import Progress, iter_json_array, open_text
+from recipes.models import RecipeScore, normalize_title
+from recipes.search import update_search_vector
+
+# Models read from the fixture, parents before children, with the fields
+# that identify a row already in the database.
+NATURAL_KEYS = {
+    'auth.user': ('username',),
+    'recipes.ingredient': ('normalized_title', 'dimension'),
+    'recipes.recipe': ('name',),
+    'recipes.recipeingredient': ('recipe', 'ingredient'),
+    'users.follow': ('user', 'author'),
+    'users.favorite': ('user', 'recipe'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Import users, ingredients, recipes, follows and favorites from '
+            'a dumpdata fixture such as data.json')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fixture, or a zip archive of one')
+        parser.add_argument('--member', help='File to read from the archive')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Rows are matched with the database on their natural keys, e.g.
+        users on username and ingredients on normalized title and
+        dimension. Rows that already exist are left alone, recipes with
+        their ingredients. New rows get new primary keys and references
+        to fixture keys are rewritten, so the fixture may list models in
+        any order and never overwrites or steals unrelated rows.
+        """
+        self.batch_size = options['batch_size']
+        self.pks = {label: {} for label in NATURAL_KEYS}
+        self.pending = {label: [] for label in NATURAL_KEYS}
+        self.kept_recipes = set()
+        self.recipes = []
+        self.existing = 0
+        self.progress = Progress()
+        skipped = 0
+        source = open_text(options['path'], options['member'])
+        try:
+            with source as (stream, name), transaction.atomic():
+                for item in iter_json_array(stream):
+                    label = item['model'].lower()
+                    if label not in self.pending:
+                        skipped += 1
+                        continue
+                    self.add(label, item.get('pk'), item['fields'])
+                for label in NATURAL_KEYS:
+                    self.save(label, final=True)
+        except (OSError, KeyError, ValueError, LookupError,
+                IntegrityError) as error:
+            raise CommandError(error)
+
+        update_search_vector(self.recipes)
+        RecipeScore.objects.bulk_create(
+            (RecipeScore(recipe_id=recipe_id) for recipe_id in self.recipes),
+            ignore_conflicts=True,
+        )
+        call_command('recount', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.progress}, {self.existing} already existed, '
+            f'skipped {skipped} other objects'
+        ))
+
+    def add(self, label, pk, fields):
+        model = apps.get_model(label)
+        if label == 'recipes.ingredient':
+            fields['normalized_title'] = normalize_title(fields['title'])
+        values = {}
+        for name, value in fields.items():
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                continue
+            values[field.attname] = (value if field.is_relation
+                                     else field.to_python(value))
+        self.pending[label].append((pk, model(**values)))
+        if len(self.pending[label]) >= self.batch_size:
+            self.save(label)
+
+    def resolve(self, label, rows, final):
+        """Rewrite the foreign keys of ``rows`` to database keys.
+
+        Rows whose parents have not been read yet are kept pending until
+        the end of the fixture.
+        """
+        model = apps.get_model(label)
+        relations = [
+            (field, field.related_model._meta.label_lower)
+            for field in model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model._meta.label_lower in self.pks
+        ]
+        resolved, unresolved = [], []
+        for pk, obj in rows:
+            for field, parent in relations:
+                value = getattr(obj, field.attname)
+                if value is None or value not in self.pks[parent]:
+                    if final:
+                        raise CommandError(
+                            f'{label} {pk} refers to {parent} {value}, '
+                            f'which is not in the fixture'
+                        )
+                    unresolved.append((pk, obj))
+                    break
+            else:
+                for field, parent in relations:
+                    setattr(obj, field.attname,
+                            self.pks[parent][getattr(obj, field.attname)])
+                resolved.append((pk, obj))
+        return resolved, unresolved
+
+    def save(self, label, final=False):
+        rows, self.pending[label] = self.resolve(label, self.pending[label],
+                                                 final)
+        if label == 'recipes.recipeingredient':
+            # Recipes that already existed keep their own ingredients.
+            kept = [row for row in rows
+                    if row[1].recipe_id in self.kept_recipes]
+            self.existing += len(kept)
+            rows = [row for row in rows
+                    if row[1].recipe_id not in self.kept_recipes]
+        if not rows:
+            return
+        model = apps.get_model(label)
+        fields = [model._meta.get_field(name)
+                  for name in NATURAL_KEYS[label]]
+
+        def key(obj):
+            return tuple(getattr(obj, field.attname) for field in fields)
+
+        keys = {key(obj) for pk, obj in rows}
+        existing = self.lookup(model, fields, keys)
+        new = {}
+        for pk, obj in rows:
+            if key(obj) not in existing:
+                new.setdefault(key(obj), obj)
+        # bulk_create() stamps auto_now fields with the current time, the
+        # dumped values are written back once the rows exist. Stamps
+        # missing from older dumps keep the current time.
+        stamped = [field for field in model._meta.concrete_fields
+                   if getattr(field, 'auto_now', False)
+                   or getattr(field, 'auto_now_add', False)]
+        stamps = [(obj, [getattr(obj, field.attname) for field in stamped])
+                  for obj in new.values()]
+        model.objects.bulk_create(new.values())
+        created = self.lookup(model, fields, set(new))
+        restored = []
+        for obj, values in stamps:
+            obj.pk = created[key(obj)]
+            if None not in values:
+                for field, value in zip(stamped, values):
+                    setattr(obj, field.attname, value)
+                restored.append(obj)
+        if stamped and restored:
+            model.objects.bulk_update(restored,
+                                      [field.name for field in stamped])
+
+        for pk, obj in rows:
+            self.pks[label][pk] = existing.get(key(obj)) or created[key(obj)]
+        if label == 'recipes.recipe':
+            self.kept_recipes.update(existing.values())
+            self.recipes += created.values()
+        self.existing += len(rows) - len(new)
+        self.progress.add(len(new))
+        self.stdout.write(f'{label}: {self.progress}')
+
+    def lookup(self, model, fields, keys):
+        """Primary keys of the rows of ``model`` with the given keys."""
+        if not keys:
+            return {}
+        attnames = [field.attname for field in fields]
+        rows = model.objects.filter(**{
+            f'{attname}__in': {key[i] for key in keys}
+            for i, attname in enumerate(attnames)
+        }).values_list('pk', *attnames)
+        found = {}
+        for pk, *values in rows.iterator():
+            if tuple(values) in keys:
+                found[tuple(values)] = pk
+        return found
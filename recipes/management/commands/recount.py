@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe
+from users.models import AuthorStats, Favorite, Follow
+
+
+def count_of(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute favorite, recipe and follower counters'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_of(Favorite.objects, 'recipe')
+        )
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=pk) for pk in get_user_model().objects
+             .filter(stats__isnull=True).values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        authors = AuthorStats.objects.update(
+            recipes_count=count_of(Recipe.objects, 'author'),
+            followers_count=count_of(Follow.objects, 'author'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted {recipes} recipes and {authors} authors'
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.popularity import refresh
+
+
+class Command(BaseCommand):
+    help = 'Recompute popularity scores of recipes with changed favorites'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and refresh every INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = refresh(options['batch_size'])
+            self.stdout.write(f'Refreshed {count} recipes')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Generate missing thumbnails for all recipe images and prefill '
+            'the thumbnail key-value store')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).only('image')
+        count = 0
+        for recipe in recipes.iterator():
+            generate_thumbnails(recipe.image)
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Warmed thumbnails for {count} recipes')
+        )
@@ -0,0 +1,68 @@
+import logging
+from collections import defaultdict
+
+from django.db import migrations
+
+import recipes.fields
+
+TAGS = [('breakfast', 'Завтрак'), ('lunch', 'Обед'), ('dinner', 'Ужин')]
+
+logger = logging.getLogger(__name__)
+
+
+def tags_to_mask(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    field = Recipe._meta.get_field('tag_mask')
+    by_mask = defaultdict(list)
+    for pk, tags in Recipe.objects.values_list('pk', 'tags'):
+        if isinstance(tags, str):
+            tags = tags.split(',')
+        tags = [tag for tag in tags or [] if tag]
+        unknown = [tag for tag in tags if tag not in field.bits]
+        if unknown:
+            # The bitmask has no room for them, they are dropped.
+            logger.warning('Dropping unknown tags %s of recipe %s',
+                           ', '.join(unknown), pk)
+        by_mask[field.to_mask(tag for tag in tags
+                              if tag in field.bits)].append(pk)
+    for mask, pks in by_mask.items():
+        Recipe.objects.filter(pk__in=pks).update(tag_mask=mask)
+
+
+def mask_to_tags(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    by_tags = defaultdict(list)
+    for pk, tags in Recipe.objects.values_list('pk', 'tag_mask'):
+        by_tags[tuple(tags)].append(pk)
+    for tags, pks in by_tags.items():
+        Recipe.objects.filter(pk__in=pks).update(tags=list(tags) or None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_auto_20210610_2146'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_mask',
+            field=recipes.fields.TagsField(blank=True, default=list, tag_choices=TAGS, verbose_name='Теги'),
+        ),
+        migrations.RunPython(tags_to_mask, mask_to_tags),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='tags',
+        ),
+        migrations.RenameField(
+            model_name='recipe',
+            old_name='tag_mask',
+            new_name='tags',
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='tags',
+            field=recipes.fields.TagsField(blank=True, db_index=True, default=list, tag_choices=TAGS, verbose_name='Теги'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('users', 'Favorite')
+    Recipe.objects.update(favorites_count=Coalesce(Subquery(
+        Favorite.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe').annotate(total=Count('pk')).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_ordering'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавили в избранное'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
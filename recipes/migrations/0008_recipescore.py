@@ -0,0 +1,37 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_favorited_recipes(apps, schema_editor):
+    Favorite = apps.get_model('users', 'Favorite')
+    RecipeScore = apps.get_model('recipes', 'RecipeScore')
+    RecipeScore.objects.bulk_create(
+        RecipeScore(recipe_id=recipe_id)
+        for recipe_id in Favorite.objects.values_list(
+            'recipe_id', flat=True
+        ).distinct()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_favorites_count'),
+        ('users', '0003_favorite_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('score', models.FloatField(blank=True, db_index=True, null=True, verbose_name='Популярность')),
+                ('dirty', models.BooleanField(db_index=True, default=True, verbose_name='Требует пересчета')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.RunPython(mark_favorited_recipes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def normalize_title(title):
+    return ' '.join(title.lower().replace('ё', 'е').split())
+
+
+def deduplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    by_key = defaultdict(list)
+    ingredients = Ingredient.objects.order_by('pk')
+    for ingredient in ingredients.iterator():
+        ingredient.normalized_title = normalize_title(ingredient.title)
+        by_key[ingredient.normalized_title, ingredient.dimension].append(
+            ingredient
+        )
+    Ingredient.objects.bulk_update(
+        [item for items in by_key.values() for item in items],
+        ['normalized_title'], batch_size=1000
+    )
+
+    duplicates = {}
+    for keeper, *others in by_key.values():
+        for other in others:
+            duplicates[other.pk] = keeper.pk
+    if not duplicates:
+        return
+    # A recipe may list two spellings of the same ingredient, their
+    # amounts are merged into the row of the kept ingredient.
+    rows = RecipeIngredient.objects.filter(ingredient_id__in=duplicates)
+    for row in list(rows):
+        keeper_id = duplicates[row.ingredient_id]
+        kept = RecipeIngredient.objects.filter(recipe_id=row.recipe_id,
+                                               ingredient_id=keeper_id)
+        if kept.update(amount=models.F('amount') + row.amount):
+            row.delete()
+        else:
+            row.ingredient_id = keeper_id
+            row.save(update_fields=['ingredient'])
+    Ingredient.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipeingredient_ingredient_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_title',
+            field=models.CharField(default='', editable=False, max_length=75, verbose_name='Название для поиска'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(deduplicate_ingredients,
+                             migrations.RunPython.noop),
+    ]
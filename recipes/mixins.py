@@ -1,9 +1,13 @@
 from django.conf import settings
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Exists, OuterRef
 from django.shortcuts import render
 
-from .models import Recipe
+from users.models import Favorite
+from users.timelines import Timeline
+
+from .models import Recipe, RecipeQuerySet
+from .paginators import KeysetPaginator
 
 
 class MainMixin:
@@ -12,24 +16,64 @@ class MainMixin:
     queryset = Recipe.objects.all()
     tags = True
     profile = False
+    favorites = True
+    keyset = False
+    feed = False
 
     def get(self, request):
-        request.session.setdefault('purchases', value=[])
         items = self.queryset
+        if isinstance(items, RecipeQuerySet):
+            items = items.listing()
+        # The default tag selection is not stored, so that merely viewing
+        # a page does not create or rewrite the session.
+        tag_list = request.session.get('tag_list', settings.TAGS)
         if self.tags:
-            request.session.setdefault(
-                'tag_list',
-                value=settings.TAGS
-            )
-            tag_list = request.session['tag_list'] or settings.TAGS
-            query = Q()
-            for tag in tag_list:
-                query.add(Q(tags__contains=tag), Q.OR)
-            items = items.filter(query)
+            items = items.with_tags(tag_list or settings.TAGS)
+        if self.favorites and request.user.is_authenticated:
+            items = items.annotate(is_favorite=Exists(
+                Favorite.objects.filter(recipe=OuterRef('pk'),
+                                        user=request.user)
+            ))
+
+        if self.feed:
+            items = Timeline(request.user.pk, items)
 
-        paginator = Paginator(items, settings.PAGINATOR_NUM_PER_PAGE)
-        page_number = request.GET.get('page')
-        page = paginator.get_page(page_number)
+        sort = None
+        search = ''
+        if isinstance(items, RecipeQuerySet):
+            search = request.GET.get('q', '').strip()
+        if search:
+            items = items.search(search)
+        key = ('pub_date', 'pk')
+        if search:
+            key = ('search_rank', 'pk')
+        elif self.keyset and request.GET.get('sort') == 'popular':
+            sort = 'popular'
+            items = items.popular()
+            key = ('popularity_score', 'pk')
+        # Links with a page number, e.g. bookmarked before keyset
+        # pagination, still get that page.
+        if self.keyset and 'page' not in request.GET:
+            paginator = KeysetPaginator(items,
+                                        settings.PAGINATOR_NUM_PER_PAGE,
+                                        key=key)
+            page = paginator.get_page(request.GET.get('cursor'))
+        else:
+            if sort:
+                items = items.order_by('-popularity_score', '-pk')
+            elif search and not items.query.order_by:
+                items = items.order_by('-search_rank', '-pub_date', '-pk')
+            paginator = Paginator(items, settings.PAGINATOR_NUM_PER_PAGE)
+            page_number = request.GET.get('page')
+            page = paginator.get_page(page_number)
+        query_params = request.GET.copy()
+        query_params.pop('cursor', None)
+        query_params.pop('page', None)
+        # The search form carries the other parameters, e.g. the sort or
+        # the ingredients of /cook/.
+        hidden_params = [(name, value)
+                         for name, values in query_params.lists()
+                         if name != 'q' for value in values]
         return render(
             request,
             self.template,
@@ -39,7 +83,14 @@ class MainMixin:
                 'page': page,
                 'paginator': paginator,
                 'tags': self.tags,
+                'tag_list': tag_list,
                 'card_tmp': self.card_template,
                 'profile': self.profile,
+                'keyset': self.keyset,
+                'sort': sort,
+                'search': search,
+                'query_params': query_params.urlencode(),
+                'hidden_params': hidden_params,
+                'card_cache_timeout': settings.RECIPE_CARD_CACHE_TIMEOUT,
             }
         )
@@ -1,10 +1,13 @@
 import os
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Cast, Coalesce
 
-from multiselectfield import MultiSelectField
+from .fields import TagsField
 
 TAGS = (
     ('breakfast', 'Завтрак'),
@@ -12,19 +15,113 @@ TAGS = (
     ('dinner', 'Ужин')
 )
 
+SEARCH_CONFIG = 'russian'
+
+# Popularity of recipes without a score, below any log score computed by
+# recipes.popularity.
+UNSCORED = -1e9
+
+
+def normalize_title(title):
+    """Lookup form of an ingredient title: lowercased, ё folded to е."""
+    return ' '.join(title.lower().replace('ё', 'е').split())
+
 
 class Ingredient(models.Model):
     title = models.CharField(max_length=75, verbose_name='Название')
+    normalized_title = models.CharField(max_length=75, editable=False,
+                                        verbose_name='Название для поиска')
     dimension = models.CharField(max_length=25, verbose_name='Количество')
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['title']
+        constraints = [models.UniqueConstraint(
+            fields=['normalized_title', 'dimension'],
+            name='unique_ingredient'
+        )]
+        # The unique index serves equality lookups, prefix searches need
+        # the pattern operator class on Postgres.
+        indexes = [models.Index(fields=['normalized_title'],
+                                name='ingredient_title_prefix',
+                                opclasses=['varchar_pattern_ops'])]
 
     def __str__(self):
         return f'{self.title} / {self.dimension}'
 
+    def save(self, *args, **kwargs):
+        self.normalized_title = normalize_title(self.title)
+        super().save(*args, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+    listing_fields = ('name', 'slug', 'tags', 'author__username',
+                      'cooking_time', 'image', 'pub_date')
+
+    def listing(self):
+        return self.select_related('author').only(*self.listing_fields)
+
+    def popular(self):
+        """Recipes annotated with ``popularity_score``.
+
+        Recipes that were never favorited, or not scored yet, get
+        UNSCORED so that they follow the scored ones.
+        """
+        return self.annotate(popularity_score=Coalesce(
+            'popularity__score', models.Value(UNSCORED),
+            output_field=models.FloatField(),
+        ))
+
+    def search(self, query):
+        """Recipes matching ``query``, annotated with ``search_rank``."""
+        if connections[self.db].vendor == 'postgresql':
+            search_query = SearchQuery(query, config=SEARCH_CONFIG,
+                                       search_type='websearch')
+            # ts_rank() is a real, cast it so that cursor values survive
+            # the round trip through Python floats.
+            return self.filter(search_vector=search_query).annotate(
+                search_rank=Cast(SearchRank(models.F('search_vector'),
+                                            search_query),
+                                 models.FloatField())
+            )
+        return self.filter(
+            models.Q(name__icontains=query)
+            | models.Q(description__icontains=query)
+            | models.Q(ingredients__ingredient__title__icontains=query)
+        ).distinct().annotate(search_rank=models.Value(
+            1.0, output_field=models.FloatField()
+        ))
+
+    def cookable_with(self, ingredient_ids):
+        """Recipes sharing an ingredient with ``ingredient_ids``.
+
+        Candidates are looked up through the (ingredient, recipe) index
+        of RecipeIngredient, only their rows are aggregated into
+        ``ingredients_matched`` and ``ingredients_missing``. Recipes that
+        miss the fewest ingredients come first.
+        """
+        ingredient_ids = set(ingredient_ids)
+        candidates = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('recipe_id')
+        return self.filter(pk__in=candidates).annotate(
+            ingredients_total=models.Count('ingredients'),
+            ingredients_matched=models.Count('ingredients', filter=models.Q(
+                ingredients__ingredient_id__in=ingredient_ids
+            )),
+        ).annotate(
+            ingredients_missing=(models.F('ingredients_total')
+                                 - models.F('ingredients_matched'))
+        ).order_by('ingredients_missing', '-ingredients_matched',
+                   '-pub_date', '-pk')
+
+    def with_tags(self, tags):
+        """Recipes with any of ``tags``, unknown tags match nothing."""
+        field = self.model._meta.get_field('tags')
+        tags = [tag for tag in tags if tag in field.bits]
+        return self.filter(tags__in=field.masks_matching(tags))
+
 
 class Recipe(models.Model):
     name = models.CharField(max_length=75,
@@ -35,10 +132,12 @@ class Recipe(models.Model):
                                    null=True,
                                    verbose_name='Описание')
     slug = models.SlugField(unique=True, blank=True, null=True)
-    tags = MultiSelectField(choices=TAGS, blank=True, null=True)
+    tags = TagsField(tag_choices=TAGS, blank=True, db_index=True,
+                     verbose_name='Теги')
     author = models.ForeignKey(get_user_model(),
                                on_delete=models.CASCADE,
                                related_name='recipes',
+                               db_index=False,
                                verbose_name='Автор')
     cooking_time = models.PositiveIntegerField(validators=[
         MinValueValidator(1)
@@ -49,11 +148,23 @@ class Recipe(models.Model):
                               blank=True, null=True, verbose_name='Фотография')
     pub_date = models.DateTimeField(auto_now=True,
                                     verbose_name='Дата публикации')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Добавили в избранное'
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date'),
+        ]
 
     def __str__(self):
         return f'{self.name} - {self.author}'
@@ -70,8 +181,10 @@ class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(Recipe,
                                on_delete=models.CASCADE,
                                related_name='ingredients',
+                               db_index=False,
                                verbose_name='Рецепт')
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE,
+                                   db_index=False,
                                    verbose_name='Ингредиент')
     amount = models.PositiveIntegerField(validators=[
         MinValueValidator(1)
@@ -84,8 +197,34 @@ class RecipeIngredient(models.Model):
             fields=['recipe', 'ingredient'],
             name='recipe_ingredient'
         )]
+        indexes = [models.Index(fields=['ingredient', 'recipe'],
+                                name='ingredient_recipe')]
 
     def __str__(self):
         return f'{self.recipe.name} - {self.ingredient.title}' \
                f' - {self.ingredient.dimension}'
 
+
+class RecipeScore(models.Model):
+    """Materialized popularity of a recipe, see recipes.popularity."""
+    recipe = models.OneToOneField(Recipe,
+                                  on_delete=models.CASCADE,
+                                  primary_key=True,
+                                  related_name='popularity',
+                                  verbose_name='Рецепт')
+    score = models.FloatField(null=True, blank=True, db_index=True,
+                              verbose_name='Популярность')
+    dirty = models.BooleanField(default=True, db_index=True,
+                                verbose_name='Требует пересчета')
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id} - {self.score}'
+
+    @classmethod
+    def mark_dirty(cls, recipe_id):
+        if not cls.objects.filter(recipe_id=recipe_id).update(dirty=True):
+            cls.objects.get_or_create(recipe_id=recipe_id)
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPage(Sequence):
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Cursor pagination over a unique key, in descending order.
+
+    ``key`` names the fields, last one unique, that the rows are
+    ordered by in descending order. Each page is a single indexed range
+    query of ``per_page + 1`` rows, so its cost does not depend on how
+    deep the page is and no COUNT(*) is run. Cursors are opaque url-safe
+    strings.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, key=('pub_date', 'pk')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key = key
+
+    def encode_cursor(self, item, reverse=False):
+        values = [getattr(item, field) for field in self.key]
+        values = [value.isoformat() if isinstance(value, datetime) else value
+                  for value in values]
+        data = json.dumps([values, reverse])
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Key values and direction of ``cursor``, None if it is invalid.
+
+        Cursors are checked against the fields of the key, a cursor of
+        another listing or a forged one starts from the first page.
+        """
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values, reverse = json.loads(data)
+            if len(values) != len(self.key) or not isinstance(reverse, bool):
+                return None
+            values = [self.parse_value(field, value)
+                      for field, value in zip(self.key_fields(), values)]
+        except (TypeError, ValueError, binascii.Error):
+            return None
+        if None in values:
+            return None
+        return values, reverse
+
+    def key_fields(self):
+        query = self.object_list.query
+        opts = self.object_list.model._meta
+        for name in self.key:
+            if name == 'pk':
+                yield opts.pk
+            elif name in query.annotations:
+                yield query.annotations[name].output_field
+            else:
+                yield opts.get_field(name)
+
+    @staticmethod
+    def parse_value(field, value):
+        """``value`` of a cursor as a value of ``field``, None if invalid."""
+        kind = field.get_internal_type()
+        if kind == 'DateTimeField':
+            value = parse_datetime(value) if isinstance(value, str) else None
+            if value is None or timezone.is_aware(value) != settings.USE_TZ:
+                return None
+            return value
+        if isinstance(value, bool):
+            return None
+        if kind == 'FloatField' and isinstance(value, (int, float)):
+            return float(value)
+        if kind.endswith('IntegerField') or kind.endswith('AutoField'):
+            return value if isinstance(value, int) else None
+        return None
+
+    def seek(self, values, reverse):
+        lookup = 'gt' if reverse else 'lt'
+        query = Q()
+        for i, field in enumerate(self.key):
+            query |= Q(**dict(zip(self.key[:i], values[:i])),
+                       **{f'{field}__{lookup}': values[i]})
+        return query
+
+    def get_page(self, cursor):
+        position = self.decode_cursor(cursor) if cursor else None
+        items = self.object_list
+        reverse = False
+        ordering = [f'-{field}' for field in self.key]
+        if position is None:
+            items = items.order_by(*ordering)
+        else:
+            values, reverse = position
+            items = items.filter(self.seek(values, reverse))
+            items = items.order_by(*self.key if reverse else ordering)
+
+        items = list(items[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if reverse:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        if not items:
+            return KeysetPage(items, None, None)
+        return KeysetPage(
+            items,
+            self.encode_cursor(items[-1]) if has_next else None,
+            self.encode_cursor(items[0], reverse=True)
+            if has_previous else None,
+        )
@@ -0,0 +1,62 @@
+"""Recency-weighted popularity of recipes.
+
+Every favorite adds ``2 ** ((created - EPOCH) / half-life)`` to the score
+of its recipe, so a favorite counts twice as much as one added a
+half-life earlier. The weights are anchored to a fixed epoch rather than
+to the current time, which keeps the order of already computed scores
+stable as time passes: only recipes whose favorites changed need to be
+recomputed. Scores are stored as base-2 logarithms to stay in float
+range.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from users.models import Favorite
+
+from .models import RecipeScore
+
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+def exponent(created):
+    half_life = settings.POPULARITY_HALF_LIFE_DAYS * 24 * 60 * 60
+    return (created - EPOCH).total_seconds() / half_life
+
+
+def log_score(exponents):
+    top = max(exponents)
+    return top + math.log2(sum(2 ** (x - top) for x in exponents))
+
+
+def refresh(batch_size=500):
+    """Recompute the scores of recipes whose favorites have changed."""
+    refreshed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                RecipeScore.objects.select_for_update(skip_locked=True)
+                .filter(dirty=True)
+                .values_list('recipe_id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return refreshed
+            exponents = defaultdict(list)
+            for recipe_id, created in Favorite.objects.filter(
+                recipe_id__in=ids
+            ).values_list('recipe_id', 'created'):
+                exponents[recipe_id].append(exponent(created))
+            RecipeScore.objects.bulk_update(
+                [RecipeScore(recipe_id=recipe_id,
+                             score=log_score(exponents[recipe_id]),
+                             dirty=False)
+                 for recipe_id in exponents],
+                ['score', 'dirty'],
+            )
+            RecipeScore.objects.filter(recipe_id__in=ids).exclude(
+                recipe_id__in=list(exponents)
+            ).delete()
+        refreshed += len(ids)
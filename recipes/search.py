@@ -0,0 +1,32 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+from .models import SEARCH_CONFIG, Recipe, RecipeIngredient
+
+
+def recipe_search_vector():
+    """Weighted document of a recipe: name, ingredient titles, description."""
+    ingredients = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe')
+        .annotate(titles=StringAgg('ingredient__title', ' '))
+        .values('titles')
+    )
+    return (SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(ingredients, weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG))
+
+
+def update_search_vector(recipe_ids):
+    """Recompute the stored search document of the given recipes.
+
+    Only Postgres keeps the document, other databases fall back to
+    substring matching in RecipeQuerySet.search().
+    """
+    if connection.vendor != 'postgresql':
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=recipe_search_vector()
+    )
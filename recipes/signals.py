@@ -0,0 +1,32 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import Ingredient, Recipe
+from .search import update_search_vector
+from .thumbnails import schedule_thumbnails
+
+
+def _image_name(instance):
+    image = instance.__dict__.get('image')
+    return getattr(image, 'name', image)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_recipe_image(instance, **kwargs):
+    instance._thumbnail_source = _image_name(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def pregenerate_thumbnails(instance, **kwargs):
+    image = _image_name(instance)
+    if image and image != instance._thumbnail_source:
+        schedule_thumbnails(instance.pk)
+    instance._thumbnail_source = image
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_recipes(instance, created, **kwargs):
+    if not created:
+        update_search_vector(
+            instance.recipeingredient_set.values('recipe_id')
+        )
@@ -0,0 +1,31 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from ..thumbnails import get_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, size_name, css_class='', alt=''):
+    """Render ``image`` as a <picture> with responsive modern formats."""
+    if not image:
+        return ''
+    element = get_picture(image, settings.RECIPE_THUMBNAIL_SIZES[size_name])
+    if element is None:
+        return ''
+    width = element['width']
+    sizes = f'(max-width: {width}px) 100vw, {width}px'
+    return format_html(
+        '<picture>{}<img src="{}" width="{}" height="{}" alt="{}" '
+        'class="{}" loading="lazy"></picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', (
+            (mime_type,
+             ', '.join(f'{url} {variant_width}w'
+                       for url, variant_width in variants),
+             sizes)
+            for mime_type, variants in element['sources']
+        )),
+        element['src'], width, element['height'], alt, css_class,
+    )
@@ -0,0 +1,632 @@
+import base64
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import reverse
+from PIL import Image
+
+from users.models import Favorite, Follow, ShoppingCart
+
+from .importers import iter_json_array
+from . import popularity
+from .autocomplete import IngredientIndex, ingredient_index
+from .models import Ingredient, Recipe, RecipeIngredient, RecipeScore
+from .paginators import KeysetPaginator
+from .search import update_search_vector
+
+User = get_user_model()
+
+
+class SubscriptionsQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        cls.authors = [User.objects.create_user(f'author{i}')
+                       for i in range(5)]
+        for author in cls.authors:
+            for i in range(4):
+                Recipe.objects.create(
+                    name=f'{author.username} {i}', slug=f'{author}-{i}',
+                    author=author, cooking_time=10, tags=['lunch'],
+                )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('subscriptions')
+
+    def test_query_count_does_not_depend_on_authors(self):
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        # Warms the session cache.
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as one_author:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['page']), 1)
+
+        Follow.objects.bulk_create(Follow(user=self.user, author=author)
+                                   for author in self.authors[1:])
+        with self.assertNumQueries(len(one_author)):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['page']), len(self.authors))
+        for author in response.context['page']:
+            self.assertEqual(len(author.latest_recipes), 3)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'EXPLAIN checks need PostgreSQL')
+class ExplainPagesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create_user(f'user{i}') for i in range(3)]
+        ingredients = [Ingredient.objects.create(title=f'мука {i}',
+                                                 dimension='г')
+                       for i in range(5)]
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                name=f'Пирог {i}', slug=f'pie-{i}', author=users[i % 3],
+                cooking_time=10, tags=['lunch'],
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in ingredients[i % 3:]
+            )
+            Favorite.objects.create(user=users[0], recipe=recipe)
+        Follow.objects.create(user=users[0], author=users[1])
+
+    def test_pages_use_indexes(self):
+        out = StringIO()
+        call_command('explain_pages', username='user0', stdout=out)
+        self.assertIn('All queries use indexes', out.getvalue())
+
+
+def make_cursor(values, reverse=False):
+    data = json.dumps([values, reverse]).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author')
+        cls.recipes = [Recipe.objects.create(
+            name=f'Суп {i}', slug=f'soup-{i}', author=author,
+            cooking_time=10,
+        ) for i in range(5)]
+        start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        for i, recipe in enumerate(cls.recipes):
+            recipe.pub_date = start + timedelta(days=i)
+        Recipe.objects.bulk_update(cls.recipes, ['pub_date'])
+        # Newest first.
+        cls.recipes.reverse()
+
+    def paginator(self, per_page=2):
+        return KeysetPaginator(Recipe.objects.all(), per_page)
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator()
+        recipe = self.recipes[0]
+        for backwards in (False, True):
+            cursor = paginator.encode_cursor(recipe, reverse=backwards)
+            self.assertEqual(paginator.decode_cursor(cursor),
+                             ([recipe.pub_date, recipe.pk], backwards))
+
+    def test_next_and_previous_pages(self):
+        paginator = self.paginator()
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([list(page) for page in pages],
+                         [self.recipes[:2], self.recipes[2:4],
+                          self.recipes[4:]])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), self.recipes[2:4])
+        self.assertTrue(previous.has_next())
+        first = paginator.get_page(previous.previous_cursor)
+        self.assertEqual(list(first), self.recipes[:2])
+        self.assertFalse(first.has_previous())
+
+    def test_equal_pub_dates_are_ordered_by_pk(self):
+        Recipe.objects.update(pub_date=self.recipes[0].pub_date)
+        paginator = self.paginator()
+        page = paginator.get_page(None)
+        items = list(page)
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            items += page
+        self.assertEqual(items, sorted(self.recipes, key=lambda recipe:
+                                       -recipe.pk))
+
+    def test_invalid_cursors_start_from_the_first_page(self):
+        paginator = self.paginator()
+        pub_date, pk = self.recipes[0].pub_date, self.recipes[0].pk
+        cursors = [
+            'not a cursor', make_cursor([1, 2]), make_cursor([1.5, 2]),
+            make_cursor([pub_date.isoformat(), 2.5]),
+            make_cursor([pub_date.isoformat(), True]),
+            make_cursor([pub_date.replace(tzinfo=None).isoformat(), pk]),
+            make_cursor([pub_date.isoformat(), pk], reverse='yes'),
+            make_cursor([pub_date.isoformat()]), make_cursor({'a': 1}),
+            make_cursor(['2021-13-01T00:00:00+00:00', pk]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(paginator.decode_cursor(cursor))
+                self.assertEqual(list(paginator.get_page(cursor)),
+                                 self.recipes[:2])
+
+    def test_cursor_of_another_listing(self):
+        cursor = self.paginator().encode_cursor(self.recipes[0])
+        for params in ({'q': 'Суп'}, {'sort': 'popular'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('index'),
+                                           {**params, 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+
+
+class PopularityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{i}') for i in range(3)]
+        cls.old, cls.new, cls.unloved = [Recipe.objects.create(
+            name=name, slug=name, author=cls.users[0], cooking_time=10,
+            tags=['dinner'],
+        ) for name in ('old', 'new', 'unloved')]
+        for user in cls.users[:2]:
+            Favorite.objects.create(user=user, recipe=cls.old)
+        Favorite.objects.create(user=cls.users[2], recipe=cls.new)
+        # Two favorites a year ago weigh less than one today.
+        Favorite.objects.filter(recipe=cls.old).update(
+            created=popularity.EPOCH + timedelta(days=30)
+        )
+        Favorite.objects.filter(recipe=cls.new).update(
+            created=popularity.EPOCH + timedelta(days=395)
+        )
+
+    def popular(self):
+        response = self.client.get(reverse('index'), {'sort': 'popular'})
+        return [recipe.name for recipe in response.context['page']]
+
+    def test_scores(self):
+        self.assertEqual(popularity.refresh(), 2)
+        self.assertFalse(RecipeScore.objects.filter(dirty=True).exists())
+        scores = dict(RecipeScore.objects.values_list('recipe__name',
+                                                      'score'))
+        self.assertAlmostEqual(
+            scores['old'], 1 + popularity.exponent(popularity.EPOCH
+                                                   + timedelta(days=30))
+        )
+        self.assertGreater(scores['new'], scores['old'])
+        self.assertEqual(self.popular(), ['new', 'old', 'unloved'])
+        self.assertEqual(popularity.refresh(), 0)
+
+    def test_removed_favorites(self):
+        popularity.refresh()
+        Favorite.objects.filter(recipe=self.new).delete()
+        self.assertTrue(RecipeScore.objects.get(recipe=self.new).dirty)
+        popularity.refresh()
+        self.assertFalse(RecipeScore.objects.filter(recipe=self.new).exists())
+        self.assertEqual(self.popular(), ['old', 'unloved', 'new'])
+
+    def test_delete_favorited_recipe(self):
+        self.old.delete()
+        self.assertEqual(list(RecipeScore.objects.values_list(
+            'recipe__name', flat=True
+        )), ['new'])
+
+
+class CookSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author')
+        cls.eggs, cls.milk = [
+            Ingredient.objects.create(title=title, dimension='шт')
+            for title in ('яйца', 'молоко')
+        ]
+        for i, (name, ingredient) in enumerate((
+                ('Омлет', cls.eggs), ('Яичница', cls.eggs),
+                ('Какао', cls.milk))):
+            recipe = Recipe.objects.create(name=name, slug=f'dish-{i}',
+                                           author=author, cooking_time=10,
+                                           tags=['breakfast'])
+            RecipeIngredient.objects.create(recipe=recipe,
+                                            ingredient=ingredient, amount=1)
+        update_search_vector(Recipe.objects.values('pk'))
+
+    def test_search_keeps_ingredients(self):
+        params = {'ingredient': [self.eggs.pk, self.milk.pk]}
+        response = self.client.get(reverse('cook'), params)
+        for ingredient in (self.eggs, self.milk):
+            self.assertContains(
+                response, '<input type="hidden" name="ingredient" '
+                          f'value="{ingredient.pk}">', html=True,
+            )
+
+        response = self.client.get(reverse('cook'), {**params, 'q': 'Омлет'})
+        self.assertEqual([recipe.name for recipe in response.context['page']],
+                         ['Омлет'])
+        self.assertNotContains(response, 'type="hidden" name="q"')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(),
+                   RECIPE_THUMBNAIL_FORMATS=['WEBP'],
+                   RECIPE_THUMBNAIL_SCALES=[0.5, 1, 2])
+class PictureTest(TestCase):
+    template = Template("{% load images %}{% picture image 'card' %}")
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author')
+
+    def recipe_image(self, width, height):
+        data = BytesIO()
+        Image.new('RGB', (width, height), 'orange').save(data, 'JPEG')
+        recipe = Recipe.objects.create(
+            name=f'Торт {width}', slug=f'cake-{width}', author=self.author,
+            cooking_time=10,
+            image=SimpleUploadedFile(f'cake{width}.jpg', data.getvalue()),
+        )
+        return recipe.image
+
+    def render(self, image):
+        return self.template.render(Context({'image': image}))
+
+    def srcset_widths(self, html):
+        srcset = html.split('srcset="')[1].split('"')[0]
+        return [int(item.split()[-1][:-1]) for item in srcset.split(', ')]
+
+    def test_variants(self):
+        html = self.render(self.recipe_image(1000, 800))
+        self.assertIn('width="361" height="240"', html)
+        self.assertEqual(self.srcset_widths(html), [180, 361, 722])
+
+    def test_small_source_is_not_upscaled(self):
+        html = self.render(self.recipe_image(100, 60))
+        self.assertIn('width="100" height="60"', html)
+        self.assertEqual(self.srcset_widths(html), [100])
+
+    def test_one_cache_lookup_per_picture(self):
+        image = self.recipe_image(1000, 800)
+        html = self.render(image)
+        with mock.patch.object(cache, 'get', wraps=cache.get) as get, \
+                self.assertNumQueries(0):
+            self.assertEqual(self.render(image), html)
+        self.assertEqual(get.call_count, 1)
+
+
+class RecipeCardCacheTest(TestCase):
+    def test_saved_recipe_is_rendered_again(self):
+        recipe = Recipe.objects.create(
+            name='Борщ', slug='borscht', cooking_time=60, tags=['lunch'],
+            author=User.objects.create_user('author'),
+        )
+        self.assertContains(self.client.get(reverse('index')), 'Борщ')
+        recipe.name = 'Щи'
+        recipe.save()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Щи')
+        self.assertNotContains(response, 'Борщ')
+
+
+class IngredientIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(title=title, normalized_title=title.lower(),
+                       dimension='г')
+            for title in ('Сыр твердый', 'Сыр', 'Сыр плавленый', 'Сырники',
+                          'Сметана', 'Соль')
+        )
+
+    def setUp(self):
+        ingredient_index.invalidate()
+
+    def titles(self, query):
+        response = self.client.get(reverse('list_ingredients'),
+                                   {'query': query})
+        return [item['title'] for item in response.json()]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.titles('сыр'), [
+            'Сыр', 'Сырники', 'Сыр твердый', 'Сыр плавленый',
+        ])
+        self.assertEqual(self.titles('  СМЕ'), ['Сметана'])
+        self.assertEqual(self.titles('перец'), [])
+
+    @override_settings(INGREDIENTS_INDEX_ENABLED=False)
+    def test_same_results_without_index(self):
+        self.assertEqual(set(self.titles('сыр')), {
+            'Сыр', 'Сырники', 'Сыр твердый', 'Сыр плавленый',
+        })
+
+    def test_saved_ingredients_invalidate_index(self):
+        self.assertEqual(self.titles('мёд'), [])
+        Ingredient.objects.create(title='Мёд', dimension='г')
+        self.assertEqual(self.titles('мед'), ['Мёд'])
+        Ingredient.objects.get(title='Мёд').delete()
+        self.assertEqual(self.titles('мед'), [])
+
+    def test_index_expires(self):
+        index = IngredientIndex(ttl=0)
+        self.assertEqual(index.search('со', 5), [
+            {'title': 'Соль', 'dimension': 'г'},
+        ])
+        # bulk_create() sends no signals, only the ttl picks it up.
+        Ingredient.objects.bulk_create([Ingredient(
+            title='Сода', normalized_title='сода', dimension='г'
+        )])
+        self.assertEqual([item['title'] for item in index.search('со', 1)],
+                         ['Сода'])
+
+
+class TagsFieldTest(TestCase):
+    def setUp(self):
+        self.field = Recipe._meta.get_field('tags')
+
+    def test_mask_round_trip(self):
+        for tags in ([], ['breakfast'], ['lunch', 'dinner'],
+                     ['breakfast', 'lunch', 'dinner']):
+            with self.subTest(tags=tags):
+                mask = self.field.get_prep_value(tags)
+                self.assertEqual(self.field.from_mask(mask), tags)
+                self.assertEqual(self.field.to_python(mask), tags)
+        self.assertEqual(self.field.get_prep_value('breakfast,dinner'), 5)
+        self.assertEqual(self.field.masks_matching(['breakfast']),
+                         [1, 3, 5, 7])
+
+    def test_tags_are_saved(self):
+        author = User.objects.create_user('author')
+        recipe = Recipe.objects.create(name='Каша', slug='porridge',
+                                       author=author, cooking_time=5,
+                                       tags=['dinner', 'breakfast'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tags, ['breakfast', 'dinner'])
+
+    def test_with_tags(self):
+        author = User.objects.create_user('author')
+        for i, tags in enumerate((['breakfast'], ['lunch', 'dinner'], [])):
+            Recipe.objects.create(name=f'Блюдо {i}', slug=f'dish-{i}',
+                                  author=author, cooking_time=5, tags=tags)
+        names = Recipe.objects.with_tags(['dinner', 'brunch']).values_list(
+            'name', flat=True)
+        self.assertEqual(list(names), ['Блюдо 1'])
+        self.assertFalse(Recipe.objects.with_tags(['brunch']).exists())
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Runs ``migrate_from``, then the test, which calls ``migrate()``."""
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        self.old_apps = self.migrate_to_node(self.migrate_from)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        return self.migrate_to_node(self.migrate_to)
+
+    def migrate_to_node(self, node):
+        executor = MigrationExecutor(connection)
+        executor.migrate([node])
+        return executor.loader.project_state([node]).apps
+
+
+class TagsMigrationTest(MigrationTestCase):
+    migrate_from = ('recipes', '0004_auto_20210610_2146')
+    migrate_to = ('recipes', '0005_recipe_tags_bitmask')
+
+    def test_unknown_tags_are_dropped(self):
+        author = self.old_apps.get_model('auth', 'User').objects.create(
+            username='author')
+        OldRecipe = self.old_apps.get_model('recipes', 'Recipe')
+        for name, tags in (('a', ['breakfast', 'brunch']),
+                           ('b', ['lunch', 'dinner']), ('c', None)):
+            OldRecipe.objects.create(name=name, slug=name, author=author,
+                                     cooking_time=5, tags=tags)
+
+        with self.assertLogs('recipes.migrations', 'WARNING') as logs:
+            apps = self.migrate()
+        self.assertIn('brunch', logs.output[0])
+        NewRecipe = apps.get_model('recipes', 'Recipe')
+        self.assertEqual(
+            dict(NewRecipe.objects.values_list('name', 'tags')),
+            {'a': ['breakfast'], 'b': ['lunch', 'dinner'], 'c': []},
+        )
+
+
+class NormalizedTitleMigrationTest(MigrationTestCase):
+    migrate_from = ('recipes', '0010_recipeingredient_ingredient_recipe')
+    migrate_to = ('recipes', '0012_ingredient_unique')
+
+    def test_duplicates_are_merged(self):
+        author = self.old_apps.get_model('auth', 'User').objects.create(
+            username='author')
+        Ingredient = self.old_apps.get_model('recipes', 'Ingredient')
+        OldRecipe = self.old_apps.get_model('recipes', 'Recipe')
+        OldRecipeIngredient = self.old_apps.get_model('recipes',
+                                                      'RecipeIngredient')
+        honey, *spellings = [
+            Ingredient.objects.create(title=title, dimension='г')
+            for title in ('Мёд', 'мед', ' МЕД  ')
+        ]
+        honey_ml = Ingredient.objects.create(title='мед', dimension='мл')
+        pie, cake = [
+            OldRecipe.objects.create(name=name, slug=name, author=author,
+                                     cooking_time=5)
+            for name in ('pie', 'cake')
+        ]
+        for recipe, ingredient, amount in (
+                (pie, honey, 10), (pie, spellings[0], 5),
+                (cake, spellings[1], 20), (cake, honey_ml, 30)):
+            OldRecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount)
+
+        apps = self.migrate()
+        Ingredient = apps.get_model('recipes', 'Ingredient')
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('pk', 'normalized_title',
+                                                  'dimension')),
+            [(honey.pk, 'мед', 'г'), (honey_ml.pk, 'мед', 'мл')],
+        )
+        self.assertEqual(
+            sorted(RecipeIngredient.objects.values_list(
+                'recipe__name', 'ingredient_id', 'amount')),
+            [('cake', honey.pk, 20), ('cake', honey_ml.pk, 30),
+             ('pie', honey.pk, 15)],
+        )
+
+
+class DownloadPurchasesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer')
+        flour = Ingredient.objects.create(title='мука', dimension='г')
+        milk = Ingredient.objects.create(title='молоко', dimension='мл')
+        for i, ingredients in enumerate(([(flour, 200), (milk, 100)],
+                                         [(flour, 50)])):
+            recipe = Recipe.objects.create(name=f'Блин {i}',
+                                           slug=f'pancake-{i}',
+                                           author=cls.user, cooking_time=10)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=amount)
+                for ingredient, amount in ingredients
+            )
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def download(self, format):
+        return self.client.get(reverse('download_purchases'),
+                               {'format': format})
+
+    def test_txt(self):
+        response = self.download('txt')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename=purchase_list.txt')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'Shopping list by Foodgram\n\nМолоко - 100мл\nМука - 250г\n',
+        )
+
+    def test_csv(self):
+        response = self.download('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            ['Ингредиент,Количество,Единицы', 'Молоко,100,мл', 'Мука,250,г'],
+        )
+
+    def test_pdf(self):
+        response = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn(b'%%EOF', content[-10:])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.download('docx').status_code, 400)
+
+    def test_empty_cart(self):
+        ShoppingCart.objects.all().delete()
+        self.assertRedirects(self.download('txt'), reverse('purchases'))
+
+
+class IterJsonArrayTest(TestCase):
+    def items(self, text, chunk_size=2):
+        return list(iter_json_array(StringIO(text), chunk_size=chunk_size))
+
+    def test_items_split_across_chunks(self):
+        self.assertEqual(self.items(' [1.5, {"a": [1, 2]}, "x" ] '),
+                         [1.5, {'a': [1, 2]}, 'x'])
+        self.assertEqual(self.items('[]'), [])
+
+    def test_malformed_arrays(self):
+        for text in ('[1 2]', '[1,', '{}', '[1] 2', '[1,,2]'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                self.items(text)
+
+
+class ImportRecipesTest(TestCase):
+    fixture = [
+        {'model': 'auth.user', 'pk': 1,
+         'fields': {'username': 'cook', 'password': '!', 'email': ''}},
+        {'model': 'recipes.ingredient', 'pk': 1,
+         'fields': {'title': 'Соль', 'dimension': 'г'}},
+        {'model': 'recipes.ingredient', 'pk': 2,
+         'fields': {'title': 'Мука', 'dimension': 'г'}},
+        # Children may come before their parents.
+        {'model': 'recipes.recipeingredient', 'pk': 1,
+         'fields': {'recipe': 7, 'ingredient': 2, 'amount': 100}},
+        {'model': 'recipes.recipe', 'pk': 7,
+         'fields': {'name': 'Хлеб', 'slug': 'bread', 'author': 1,
+                    'tags': 'breakfast,lunch', 'cooking_time': 60,
+                    'pub_date': '2021-02-01T10:00:00Z'}},
+        {'model': 'users.favorite', 'pk': 1,
+         'fields': {'user': 1, 'recipe': 7}},
+        {'model': 'sessions.session', 'pk': 'x', 'fields': {}},
+    ]
+
+    def load(self, fixture):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump(fixture, file)
+            file.flush()
+            call_command('import_recipes', file.name, batch_size=2,
+                         stdout=StringIO())
+
+    def test_fixture_keys_are_remapped(self):
+        # Rows of the database sitting on the primary keys of the fixture.
+        admin = User.objects.create_superuser('admin', password='x')
+        pepper = Ingredient.objects.create(title='Перец', dimension='г')
+        salt = Ingredient.objects.create(title='соль', dimension='г')
+
+        self.load(self.fixture)
+
+        cook = User.objects.get(username='cook')
+        self.assertNotEqual(cook.pk, admin.pk)
+        self.assertTrue(User.objects.get(pk=admin.pk).is_superuser)
+        self.assertEqual(Ingredient.objects.get(pk=pepper.pk).title, 'Перец')
+        self.assertEqual(Ingredient.objects.filter(title__iexact='соль')
+                         .get().pk, salt.pk)
+        recipe = Recipe.objects.get(name='Хлеб')
+        self.assertEqual(recipe.author, cook)
+        self.assertEqual(recipe.tags, ['breakfast', 'lunch'])
+        self.assertEqual(recipe.pub_date.isoformat(),
+                         '2021-02-01T10:00:00+00:00')
+        self.assertEqual([item.ingredient.title
+                          for item in recipe.ingredients.all()], ['Мука'])
+        self.assertTrue(Favorite.objects.filter(user=cook,
+                                                recipe=recipe).exists())
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).favorites_count, 1)
+
+    def test_existing_rows_are_kept(self):
+        self.load(self.fixture)
+        self.load(self.fixture)
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertEqual(RecipeIngredient.objects.count(), 1)
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    def test_missing_parent(self):
+        with self.assertRaisesMessage(CommandError, 'auth.user 5'):
+            self.load([{'model': 'users.follow', 'pk': 1,
+                        'fields': {'user': 5, 'author': 5}}])
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.base import EXTENSIONS
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Small sources are not blown up, their larger variants come out at the
+# size of the source and are dropped as duplicates.
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': False}
+
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp'}
+
+# sorl names thumbnail files after the format but does not know AVIF,
+# which Pillow only writes with pillow-avif-plugin installed.
+EXTENSIONS.setdefault('AVIF', 'avif')
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.RECIPE_THUMBNAIL_WORKERS, 1),
+    thread_name_prefix='thumbnails',
+)
+
+
+def scaled_size(size, scale):
+    width, height = (int(side) for side in size.split('x'))
+    return f'{round(width * scale)}x{round(height * scale)}'
+
+
+def render_thumbnail(image, size, **options):
+    """Thumbnail of ``image``, None when it cannot be rendered.
+
+    sorl returns a thumbnail without a size when the source file is
+    missing or unreadable and raises when the format cannot be written.
+    Both are logged and skipped, like the ``{% thumbnail %}`` tag does.
+    """
+    try:
+        thumbnail = get_thumbnail(image, size, **THUMBNAIL_OPTIONS,
+                                  **options)
+    except Exception:
+        if sorl_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Thumbnail of %s at %s failed', image, size)
+        return None
+    return thumbnail if thumbnail.size else None
+
+
+def get_variants(image, size):
+    """Thumbnails of ``image`` for a ``<picture>`` element.
+
+    Returns the default-format fallback and a list of
+    ``(mime type, thumbnails)`` sources, one per configured modern
+    format, each rendered at every configured scale that yields a
+    distinct width. The fallback is None and there are no sources when
+    the image cannot be rendered.
+    """
+    fallback = render_thumbnail(image, size)
+    if fallback is None:
+        return None, []
+    sources = []
+    for image_format in settings.RECIPE_THUMBNAIL_FORMATS:
+        thumbnails = {}
+        for scale in settings.RECIPE_THUMBNAIL_SCALES:
+            thumbnail = render_thumbnail(image, scaled_size(size, scale),
+                                         format=image_format)
+            if thumbnail is not None:
+                thumbnails.setdefault(thumbnail.width, thumbnail)
+        if thumbnails:
+            sources.append((MIME_TYPES[image_format],
+                            list(thumbnails.values())))
+    return fallback, sources
+
+
+def picture_key(image, size):
+    key = ':'.join([image.name, size,
+                    ','.join(settings.RECIPE_THUMBNAIL_FORMATS),
+                    ','.join(map(str, settings.RECIPE_THUMBNAIL_SCALES))])
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return f'{sorl_settings.THUMBNAIL_KEY_PREFIX}-picture:{digest}'
+
+
+def get_picture(image, size):
+    """Urls and sizes of the variants of ``image``, None if it failed.
+
+    Each variant would cost a key-value store lookup, so the whole
+    ``<picture>`` is cached as a single entry: ``src``, ``width``,
+    ``height`` of the fallback and ``sources``, a list of
+    ``(mime type, [(url, width)])``. Failures are not cached.
+    """
+    cache = caches[sorl_settings.THUMBNAIL_CACHE]
+    key = picture_key(image, size)
+    picture = cache.get(key)
+    if picture is None:
+        fallback, sources = get_variants(image, size)
+        if fallback is None:
+            return None
+        picture = {
+            'src': fallback.url,
+            'width': fallback.width,
+            'height': fallback.height,
+            'sources': [
+                (mime_type, [(thumbnail.url, thumbnail.width)
+                             for thumbnail in thumbnails])
+                for mime_type, thumbnails in sources
+            ],
+        }
+        cache.set(key, picture, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+    return picture
+
+
+def generate_thumbnails(image):
+    """Render every configured thumbnail variant of ``image``."""
+    for size in settings.RECIPE_THUMBNAIL_SIZES.values():
+        get_picture(image, size)
+
+
+def _generate_for_recipe(recipe_id):
+    close_old_connections()
+    try:
+        recipe = Recipe.objects.only('image').filter(pk=recipe_id).first()
+        if recipe is not None and recipe.image:
+            generate_thumbnails(recipe.image)
+    except Exception:
+        logger.exception('Thumbnail generation failed for recipe %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnails(recipe_id):
+    """Generate thumbnails off the request path once the save commits."""
+    if settings.RECIPE_THUMBNAIL_WORKERS:
+        transaction.on_commit(
+            lambda: executor.submit(_generate_for_recipe, recipe_id)
+        )
+    else:
+        transaction.on_commit(lambda: _generate_for_recipe(recipe_id))
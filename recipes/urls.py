@@ -4,6 +4,7 @@ from . import views
 
 urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
+    path('cook/', views.CookView.as_view(), name='cook'),
     path('purchases/', views.PurchaseView.as_view(), name='purchases'),
     path('purchases/download/', views.download_purchases,
          name='download_purchases'),
@@ -22,6 +23,7 @@ urlpatterns = [
     path('ingredients/', views.list_ingredients, name='list_ingredients'),
     path('tag/<str:tag>/', views.edit_tag, name='edit_tag'),
 
+    path('feed/', views.FeedView.as_view(), name='feed'),
     path('subscriptions/', views.SubscribeView.as_view(),
          name='subscriptions'),
     path('subscriptions/<int:user_id>/', views.SubscribeView.as_view(),
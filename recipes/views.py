@@ -1,24 +1,47 @@
 import json
 from http import HTTPStatus
+from itertools import chain
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, JsonResponse
+from django.db.models import OuterRef, Prefetch, Subquery, Sum
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import View
 from pytils.translit import slugify
 
+from users.cart import get_cart
 from users.models import Favorite, Follow, get_user_model
 
+from .autocomplete import search_ingredients
+from .exporters import EXPORTERS
 from .forms import RecipeForm
 from .mixins import MainMixin
-from .models import Ingredient, Recipe, RecipeIngredient
+from .models import Recipe, RecipeIngredient
+
+AUTHOR_CARD_RECIPES_NUM = 3
 
 
 class IndexView(MainMixin, View):
     title = 'Рецепты'
     tab = 'index'
+    keyset = True
+
+
+class CookView(MainMixin, View):
+    title = 'Что приготовить'
+    tab = 'cook'
+
+    def get(self, request):
+        try:
+            ingredient_ids = [int(value) for value
+                              in request.GET.getlist('ingredient')]
+        except ValueError:
+            return HttpResponse(status=HTTPStatus.BAD_REQUEST)
+        self.queryset = Recipe.objects.cookable_with(ingredient_ids)
+        return super().get(request)
 
 
 class FavoriteView(LoginRequiredMixin, MainMixin, View):
@@ -47,16 +70,35 @@ class FavoriteView(LoginRequiredMixin, MainMixin, View):
         return JsonResponse(data={'success': True}, safe=True)
 
 
+class FeedView(LoginRequiredMixin, MainMixin, View):
+    login_url = reverse_lazy('login')
+    title = 'Лента'
+    tab = 'feed'
+    tags = False
+    feed = True
+
+
 class SubscribeView(LoginRequiredMixin, MainMixin, View):
     login_url = reverse_lazy('login')
     title = 'Подписки'
     tab = 'subscriptions'
     card_template = 'author_card.html'
     tags = False
+    favorites = False
 
     def get(self, request):
-        self.queryset = (get_user_model().
-                         objects.filter(following__user=request.user))
+        latest = Recipe.objects.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('pk')[:AUTHOR_CARD_RECIPES_NUM]
+        ))
+        self.queryset = (get_user_model().objects
+                         .filter(following__user=request.user)
+                         .select_related('stats')
+                         .prefetch_related(Prefetch('recipes',
+                                                    queryset=latest,
+                                                    to_attr='latest_recipes'))
+                         .order_by('username'))
         return super().get(request)
 
     def post(self, request):
@@ -84,27 +126,15 @@ class PurchaseView(MainMixin, View):
     def post(self, request):
         data = json.loads(request.body)
         try:
-            recipe_id = data['id']
-        except TypeError:
+            recipe_id = int(data['id'])
+        except (TypeError, KeyError, ValueError):
             return HttpResponse(status=HTTPStatus.BAD_REQUEST)
         get_object_or_404(Recipe, id=recipe_id)
-        purchases = request.session['purchases']
-        success = False
-        if recipe_id not in purchases:
-            purchases.append(recipe_id)
-            request.session['purchases'] = purchases
-            success = True
+        success = get_cart(request).add(recipe_id)
         return JsonResponse(data={'success': success}, safe=True)
 
     def delete(self, request, recipe_id):
-        id_recipe = str(recipe_id)
-        get_object_or_404(Recipe, id=recipe_id)
-        purchases = request.session['purchases']
-        success = False
-        if id_recipe in purchases:
-            purchases.remove(id_recipe)
-            request.session['purchases'] = purchases
-            success = True
+        success = get_cart(request).remove(recipe_id)
         return JsonResponse(data={'success': success}, safe=True)
 
 
@@ -122,47 +152,15 @@ class CreateRecipeView(LoginRequiredMixin, View):
 
     def post(self, request):
         form = RecipeForm(request.POST, files=request.FILES)
-        if form.is_valid():
-            ing_names = request.POST.getlist('nameIngredient')
-            ing_values = request.POST.getlist('valueIngredient')
-            ing_units = request.POST.getlist('unitsIngredient')
-
-            recipe = form.save(commit=False)
-            recipe.author = request.user
-            recipe.slug = slugify(recipe.name)
-
-            if len(ing_names) == len(ing_units) == len(ing_values) != 0:
-                for values in ing_values:
-                    if int(values) >= 0:
-                        recipe.save()
-                        counter = len(ing_names)
-                        for i in range(counter):
-                            ingredient = get_object_or_404(
-                                Ingredient,
-                                title=ing_names[i],
-                                dimension=ing_units[i]
-                            )
-                            RecipeIngredient.objects.get_or_create(
-                                recipe=recipe,
-                                ingredient=ingredient,
-                                amount=ing_values[i])
-                    else:
-                        return render(request, 'recipe_form.html',
-                              context={
-                                  'form': form,
-                                  'ing_error': 'Значение должно быть больше или равно 0.'
-                              })
-
-            else:
-                return render(request, 'recipe_form.html',
-                              context={
-                                  'form': form,
-                                  'ing_error': 'Добавьте ингредиентов'
-                              })
-        else:
+        if not form.is_valid():
             return render(request, 'recipe_form.html', context={'form': form})
-
+        recipe = form.instance
+        recipe.author = request.user
+        recipe.slug = slugify(recipe.name)
+        form.save()
         return redirect('recipe', username=recipe.author, slug=recipe.slug)
+
+
 class EditRecipeView(LoginRequiredMixin, View):
     login_url = reverse_lazy('login')
 
@@ -184,43 +182,10 @@ class EditRecipeView(LoginRequiredMixin, View):
             return redirect('recipe', username=recipe.author, slug=recipe.slug)
 
         form = RecipeForm(request.POST, files=request.FILES, instance=recipe)
-        if form.is_valid():
-            ing_names = request.POST.getlist('nameIngredient')
-            ing_values = request.POST.getlist('valueIngredient')
-            ing_units = request.POST.getlist('unitsIngredient')
-
-            if len(ing_names) == len(ing_units) == len(ing_values) != 0:
-                for values in ing_values:
-                    if int(values) >= 0:
-                        form.save()
-                        RecipeIngredient.objects.filter(recipe=recipe).delete()
-                        counter = len(ing_names)
-                        for i in range(counter):
-                            ingredient = get_object_or_404(
-                                Ingredient,
-                                title=ing_names[i],
-                                dimension=ing_units[i]
-                            )
-                            RecipeIngredient.objects.get_or_create(
-                                recipe=recipe,
-                                ingredient=ingredient,
-                                amount=ing_values[i])
-                    else:
-                        return render(request, 'recipe_form.html',
-                                      context={
-                                          'form': form,
-                                          'ing_error': 'Значение должно быть больше или равно 0.'
-                                      })
-
-            else:
-                return render(request, 'recipe_form.html',
-                              context={
-                                  'form': form,
-                                  'ing_error': 'Добавьте ингредиентов'
-                              })
-        else:
+        if not form.is_valid():
             return render(request, 'recipe_form.html',
                           context={'form': form, 'recipe': recipe})
+        form.save()
         return redirect('recipe', username=recipe.author, slug=recipe.slug)
 
 
@@ -239,46 +204,46 @@ def delete_recipe(request, username, slug):
 def list_ingredients(request):
     try:
         query = request.GET.get('query').lower()
-    except TypeError:
+    except AttributeError:
         return HttpResponse(status=HTTPStatus.BAD_REQUEST)
-    ingredients = Ingredient.objects.filter(title__istartswith=query).values(
-        'title', 'dimension'
-    )
-    return JsonResponse(list(ingredients), safe=False)
+    return JsonResponse(search_ingredients(query), safe=False)
 
 
 def edit_tag(request, tag):
     previous_url = request.META.get('HTTP_REFERER')
-    tags = request.session.get('tag_list')
+    tags = list(request.session.get('tag_list', settings.TAGS))
     if tag in tags:
         tags.remove(tag)
     else:
         tags.append(tag)
-    request.session['tag_list'] = tags
+    if set(tags) == set(settings.TAGS):
+        request.session.pop('tag_list', None)
+    else:
+        request.session['tag_list'] = tags
     return redirect(previous_url)
 
 def download_purchases(request):
-    filename = 'purchase_list.txt'
-    ids = request.session['purchases']
-    all_ingredients = RecipeIngredient.objects.filter(recipe_id__in=ids)
-    ingredients = {}
-    for ingredient in all_ingredients:
-        if ingredient.ingredient.title in ingredients:
-            ingredients[ingredient.ingredient.title][0] += ingredient.amount
-        else:
-            ingredients[ingredient.ingredient.title] = [
-                ingredient.amount, ingredient.ingredient.dimension
-            ]
-
-    content = ['Shopping list by Foodgram\n\n']
-    for i, v in ingredients.items():
-        content.append(f'{i.capitalize()} - {v[0]}{v[1]}\n')
-
-    response = HttpResponse(content, content_type='text/plain')
-    if not len(ingredients.keys()):
+    exporter_class = EXPORTERS.get(request.GET.get('format', 'txt'))
+    if exporter_class is None:
+        return HttpResponse(status=HTTPStatus.BAD_REQUEST)
+    recipes = get_cart(request).recipes()
+    ingredients = (
+        RecipeIngredient.objects.filter(recipe__in=recipes)
+        .values('ingredient__title', 'ingredient__dimension')
+        .annotate(total=Sum('amount'))
+        .order_by('ingredient__title', 'ingredient__dimension')
+        .values_list('ingredient__title', 'ingredient__dimension', 'total')
+        .iterator()
+    )
+    first = next(ingredients, None)
+    if first is None:
         return redirect('purchases')
-    response['Content-Disposition'] = 'attachment; filename={0}'.format(
-        filename
+
+    exporter = exporter_class(chain([first], ingredients))
+    response = StreamingHttpResponse(exporter,
+                                     content_type=exporter.content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename=purchase_list.{exporter.extension}'
     )
     return response
 
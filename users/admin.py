@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Favorite, Follow
+from .models import AuthorStats, Favorite, Follow, ShoppingCart
 
 admin.site.register(Follow)
 admin.site.register(Favorite)
+admin.site.register(AuthorStats)
+admin.site.register(ShoppingCart)
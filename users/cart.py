@@ -0,0 +1,93 @@
+from django.db import IntegrityError, transaction
+from django.utils.functional import cached_property
+
+from recipes.models import Recipe
+
+from .models import ShoppingCart
+
+SESSION_KEY = 'purchases'
+
+
+class Cart:
+    """Shopping list of the current visitor.
+
+    Users keep ShoppingCart rows, adding or removing a recipe is a
+    single write against the (user, recipe) index. Anonymous visitors
+    keep the recipe ids in their session until they log in. ``ids`` is
+    loaded once per request, membership checks are set lookups.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user if request.user.is_authenticated else None
+        if self.user is not None and SESSION_KEY in request.session:
+            merge_session_cart(request.session, self.user)
+
+    @cached_property
+    def ids(self):
+        if self.user is None:
+            return {int(recipe_id) for recipe_id
+                    in self.request.session.get(SESSION_KEY, [])}
+        return set(ShoppingCart.objects.filter(user=self.user).values_list(
+            'recipe_id', flat=True
+        ))
+
+    def __contains__(self, recipe_id):
+        return recipe_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def recipes(self):
+        if self.user is None:
+            return Recipe.objects.filter(pk__in=self.ids)
+        return Recipe.objects.filter(in_carts__user=self.user)
+
+    def add(self, recipe_id):
+        if self.user is None:
+            if recipe_id in self.ids:
+                return False
+            self.ids.add(recipe_id)
+            self.request.session[SESSION_KEY] = sorted(self.ids)
+            return True
+        try:
+            with transaction.atomic():
+                ShoppingCart.objects.create(user=self.user,
+                                            recipe_id=recipe_id)
+        except IntegrityError:
+            return False
+        self.__dict__.pop('ids', None)
+        return True
+
+    def remove(self, recipe_id):
+        if self.user is None:
+            if recipe_id not in self.ids:
+                return False
+            self.ids.discard(recipe_id)
+            self.request.session[SESSION_KEY] = sorted(self.ids)
+            return True
+        deleted, _ = ShoppingCart.objects.filter(
+            user=self.user, recipe_id=recipe_id
+        ).delete()
+        self.__dict__.pop('ids', None)
+        return bool(deleted)
+
+
+def get_cart(request):
+    if not hasattr(request, '_cart'):
+        request._cart = Cart(request)
+    return request._cart
+
+
+def merge_session_cart(session, user):
+    """Move the recipes of an anonymous session cart to ``user``."""
+    ids = session.pop(SESSION_KEY, None)
+    if not ids:
+        return
+    ShoppingCart.objects.bulk_create(
+        (ShoppingCart(user=user, recipe_id=recipe_id)
+         for recipe_id in Recipe.objects.filter(
+             pk__in=ids
+         ).values_list('pk', flat=True)),
+        ignore_conflicts=True,
+    )
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F
 
 from recipes.models import Recipe
 
@@ -8,10 +9,12 @@ class Follow(models.Model):
     user = models.ForeignKey(get_user_model(),
                              on_delete=models.CASCADE,
                              related_name='follower',
+                             db_index=False,
                              verbose_name='Подписчик')
     author = models.ForeignKey(get_user_model(),
                                on_delete=models.CASCADE,
                                related_name='following',
+                               db_index=False,
                                verbose_name='Подписан')
 
     class Meta:
@@ -20,6 +23,8 @@ class Follow(models.Model):
         verbose_name_plural = 'Подписки'
         constraints = [models.UniqueConstraint(fields=['user', 'author'],
                                                name='None')]
+        indexes = [models.Index(fields=['author', 'user'],
+                                name='follow_author_user')]
 
     def __str__(self):
         return f'{self.user.username} - {self.author.username}'
@@ -28,16 +33,83 @@ class Follow(models.Model):
 class Favorite(models.Model):
     recipe = models.ForeignKey(Recipe,
                                on_delete=models.CASCADE,
-                               related_name='favorite', )
+                               related_name='favorite',
+                               db_index=False)
     user = models.ForeignKey(get_user_model(),
                              on_delete=models.CASCADE,
-                             related_name='favorite_recipe')
+                             related_name='favorite_recipe',
+                             db_index=False)
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата добавления')
 
     class Meta:
         verbose_name = 'Любимый рецепт'
         verbose_name_plural = 'Любимые рецепты'
         constraints = [models.UniqueConstraint(fields=['recipe', 'user'],
                                                name='unique_together')]
+        indexes = [models.Index(fields=['user', 'recipe'],
+                                name='favorite_user_recipe')]
 
     def __str__(self):
         return f'{self.user.username} - {self.recipe.name}'
+
+
+class ShoppingCart(models.Model):
+    recipe = models.ForeignKey(Recipe,
+                               on_delete=models.CASCADE,
+                               related_name='in_carts',
+                               verbose_name='Рецепт')
+    user = models.ForeignKey(get_user_model(),
+                             on_delete=models.CASCADE,
+                             related_name='shopping_cart',
+                             db_index=False,
+                             verbose_name='Покупатель')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Дата добавления')
+
+    class Meta:
+        verbose_name = 'Рецепт в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [models.UniqueConstraint(fields=['user', 'recipe'],
+                                               name='unique_cart_item')]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.recipe.name}'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(get_user_model(),
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats',
+                                verbose_name='Автор')
+    recipes_count = models.PositiveIntegerField(default=0,
+                                                verbose_name='Рецептов')
+    followers_count = models.PositiveIntegerField(default=0,
+                                                  verbose_name='Подписчиков')
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.user.username} - {self.recipes_count} рецептов, ' \
+               f'{self.followers_count} подписчиков'
+
+    @classmethod
+    def increment(cls, user_id, field):
+        """Atomically add one to a counter, creating the row if needed."""
+        if cls.objects.filter(user_id=user_id).update(**{field: F(field) + 1}):
+            return
+        stats, created = cls.objects.get_or_create(user_id=user_id,
+                                                   defaults={field: 1})
+        if not created:
+            cls.objects.filter(user_id=user_id).update(
+                **{field: F(field) + 1}
+            )
+
+    @classmethod
+    def decrement(cls, user_id, field):
+        cls.objects.filter(user_id=user_id, **{f'{field}__gt': 0}).update(
+            **{field: F(field) - 1}
+        )
@@ -0,0 +1,73 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Recipe, RecipeScore
+
+from . import timelines
+from .cart import merge_session_cart
+from .models import AuthorStats, Favorite, Follow
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id, favorites_count__gt=0).update(
+        favorites_count=F('favorites_count') - 1
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_saved(instance, **kwargs):
+    RecipeScore.mark_dirty(instance.recipe_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(instance, **kwargs):
+    # A favorite created the score row of its recipe. The row is left
+    # alone when it is gone, e.g. when the recipe itself is being deleted.
+    RecipeScore.objects.filter(recipe_id=instance.recipe_id).update(
+        dirty=True
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(instance, created, **kwargs):
+    if created:
+        AuthorStats.increment(instance.author_id, 'followers_count')
+        transaction.on_commit(lambda: timelines.reset(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(instance, **kwargs):
+    AuthorStats.decrement(instance.author_id, 'followers_count')
+    transaction.on_commit(lambda: timelines.reset(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_added(instance, created, **kwargs):
+    if created:
+        AuthorStats.increment(instance.author_id, 'recipes_count')
+        transaction.on_commit(
+            lambda: timelines.fan_out(instance.pk, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(instance, **kwargs):
+    AuthorStats.decrement(instance.author_id, 'recipes_count')
+    timelines.retract(instance.pk, instance.author_id)
+
+
+@receiver(user_logged_in)
+def merge_cart(request, user, **kwargs):
+    merge_session_cart(request.session, user)
@@ -0,0 +1,173 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from recipes.models import Recipe
+
+from .cart import SESSION_KEY
+from .models import AuthorStats, Favorite, Follow, ShoppingCart
+
+User = get_user_model()
+
+
+class CartTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer')
+        author = User.objects.create_user('author')
+        cls.recipes = [Recipe.objects.create(
+            name=f'Салат {i}', slug=f'salad-{i}', author=author,
+            cooking_time=10,
+        ) for i in range(3)]
+
+    def add(self, recipe):
+        response = self.client.post(reverse('purchases'),
+                                    json.dumps({'id': recipe.pk}),
+                                    content_type='application/json')
+        return response.json()['success']
+
+    def remove(self, recipe):
+        response = self.client.delete(reverse('remove_purchase',
+                                              args=[recipe.pk]))
+        return response.json()['success']
+
+    def test_user_cart(self):
+        self.client.force_login(self.user)
+        self.assertTrue(self.add(self.recipes[0]))
+        self.assertFalse(self.add(self.recipes[0]))
+        self.assertTrue(self.add(self.recipes[1]))
+        self.assertTrue(self.remove(self.recipes[0]))
+        self.assertFalse(self.remove(self.recipes[0]))
+        self.assertEqual(list(ShoppingCart.objects.values_list(
+            'user__username', 'recipe_id'
+        )), [('buyer', self.recipes[1].pk)])
+
+    def test_anonymous_cart_is_merged_on_login(self):
+        self.assertTrue(self.add(self.recipes[0]))
+        self.assertTrue(self.add(self.recipes[2]))
+        self.assertTrue(self.remove(self.recipes[2]))
+        self.assertTrue(self.add(self.recipes[1]))
+        self.assertFalse(ShoppingCart.objects.exists())
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('purchases'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(SESSION_KEY, self.client.session)
+        self.assertEqual(
+            set(ShoppingCart.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )),
+            {self.recipes[0].pk, self.recipes[1].pk},
+        )
+
+    def test_unknown_recipe(self):
+        response = self.client.post(reverse('purchases'),
+                                    json.dumps({'id': 0}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('purchases'),
+                                    json.dumps({'id': 'x'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        cls.author = User.objects.create_user('author')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def stats(self):
+        return AuthorStats.objects.filter(user=self.author).values_list(
+            'recipes_count', 'followers_count'
+        ).get()
+
+    def test_recipe_and_favorite_counters(self):
+        recipe = Recipe.objects.create(name='Суп', slug='soup',
+                                       author=self.author, cooking_time=10)
+        Recipe.objects.create(name='Каша', slug='porridge',
+                              author=self.author, cooking_time=10)
+        self.assertEqual(self.stats(), (2, 0))
+
+        self.client.post(reverse('favorites'), json.dumps({'id': recipe.pk}),
+                         content_type='application/json')
+        self.client.post(reverse('favorites'), json.dumps({'id': recipe.pk}),
+                         content_type='application/json')
+        Favorite.objects.create(user=self.author, recipe=recipe)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 2)
+
+        self.client.delete(reverse('remove_favorite', args=[recipe.pk]))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+        recipe.delete()
+        self.assertEqual(self.stats(), (1, 0))
+
+    def test_follower_counter(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.stats(), (0, 1))
+        self.client.delete(reverse('remove_subscription',
+                                   args=[self.author.pk]))
+        self.assertEqual(self.stats(), (0, 0))
+        # Counters never go below zero.
+        AuthorStats.decrement(self.author.pk, 'followers_count')
+        self.assertEqual(self.stats(), (0, 0))
+
+    def test_recount_repairs_drift(self):
+        recipe = Recipe.objects.create(name='Суп', slug='soup',
+                                       author=self.author, cooking_time=10)
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        Follow.objects.create(user=self.user, author=self.author)
+        Recipe.objects.update(favorites_count=5)
+        AuthorStats.objects.update(recipes_count=7, followers_count=0)
+
+        call_command('recount', stdout=StringIO())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(self.stats(), (1, 1))
+        self.assertEqual(AuthorStats.objects.get(user=self.user)
+                         .recipes_count, 0)
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        cls.authors = [User.objects.create_user(f'author{i}')
+                       for i in range(3)]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def feed(self):
+        response = self.client.get(reverse('feed'))
+        return [recipe.name for recipe in response.context['page']]
+
+    def publish(self, author, name):
+        return Recipe.objects.create(name=name, slug=name, author=author,
+                                     cooking_time=10, tags=['lunch'])
+
+    def test_feed(self):
+        self.publish(self.authors[0], 'first')
+        self.publish(self.authors[2], 'unfollowed')
+        second = self.publish(self.authors[1], 'second')
+        self.assertEqual(self.feed(), ['second', 'first'])
+
+        self.publish(self.authors[0], 'third')
+        second.delete()
+        self.assertEqual(self.feed(), ['third', 'first'])
+
+        Follow.objects.filter(author=self.authors[0]).delete()
+        Follow.objects.create(user=self.user, author=self.authors[2])
+        self.assertEqual(self.feed(), ['unfollowed'])
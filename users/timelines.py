@@ -0,0 +1,170 @@
+import logging
+
+from django.conf import settings
+
+from recipes.models import Recipe
+
+from .models import Follow
+
+logger = logging.getLogger(__name__)
+
+
+class RedisTimelineStore:
+    """Timelines kept as capped Redis lists, newest id first."""
+    batch_size = 1000
+
+    def __init__(self, client, length, timeout):
+        from redis.exceptions import RedisError
+        self.errors = (RedisError,)
+        self.client = client
+        self.length = length
+        self.timeout = timeout
+
+    def key(self, user_id):
+        return f'timeline:{user_id}'
+
+    def size(self, user_id):
+        key = self.key(user_id)
+        exists, size = (self.client.pipeline()
+                        .exists(key).llen(key).execute())
+        return size if exists else None
+
+    def range(self, user_id, start, stop):
+        return [int(recipe_id) for recipe_id
+                in self.client.lrange(self.key(user_id), start, stop - 1)]
+
+    def replace(self, user_id, ids):
+        key = self.key(user_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if ids:
+            pipe.rpush(key, *ids[:self.length])
+            pipe.expire(key, self.timeout)
+        pipe.execute()
+
+    def push(self, user_ids, recipe_id):
+        pipe = self.client.pipeline(transaction=False)
+        for count, user_id in enumerate(user_ids, 1):
+            # LPUSHX leaves missing timelines alone, they are rebuilt
+            # from the database on the next read.
+            pipe.lpushx(self.key(user_id), recipe_id)
+            pipe.ltrim(self.key(user_id), 0, self.length - 1)
+            if count % self.batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+
+    def remove(self, user_ids, recipe_id):
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.lrem(self.key(user_id), 0, recipe_id)
+        pipe.execute()
+
+    def clear(self, user_id):
+        self.client.delete(self.key(user_id))
+
+
+def get_store():
+    """Timeline store of the Redis cache, None without one.
+
+    Fan-out only works when every worker sees the same timelines, a
+    per-process cache such as locmem would keep serving a recipe that
+    was retracted in another worker. Without Redis the feed is read
+    from the Follow join.
+    """
+    if not settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+        return None
+    from django_redis import get_redis_connection
+    return RedisTimelineStore(get_redis_connection('default'),
+                              settings.TIMELINE_LENGTH,
+                              settings.TIMELINE_TIMEOUT)
+
+
+store = get_store()
+
+
+class Timeline:
+    """Newest recipes of the authors ``user_id`` follows.
+
+    Behaves like a sequence for ``Paginator``: its length and slices
+    are read from the timeline store, the recipes of a slice are then
+    fetched from ``queryset`` with one query. A missing timeline is
+    rebuilt from the Follow join once; without a store, or if it is
+    unavailable, the join is paginated directly.
+    """
+
+    def __init__(self, user_id, queryset):
+        self.user_id = user_id
+        self.queryset = queryset
+        self.fallback = self._join() if store is None else None
+
+    def _join(self):
+        return self.queryset.filter(
+            author__following__user=self.user_id
+        ).order_by('-pk')
+
+    def _fall_back(self):
+        logger.exception('Timeline store is unavailable')
+        self.fallback = self._join()
+
+    def __len__(self):
+        if self.fallback is None:
+            try:
+                size = store.size(self.user_id)
+                if size is None:
+                    ids = list(Recipe.objects.filter(
+                        author__following__user=self.user_id
+                    ).order_by('-pk').values_list(
+                        'pk', flat=True
+                    )[:settings.TIMELINE_LENGTH])
+                    store.replace(self.user_id, ids)
+                    size = len(ids)
+                return size
+            except store.errors:
+                self._fall_back()
+        return self.fallback.count()
+
+    def __getitem__(self, index):
+        if self.fallback is None:
+            try:
+                ids = store.range(self.user_id, index.start or 0,
+                                  index.stop)
+            except store.errors:
+                self._fall_back()
+            else:
+                recipes = self.queryset.in_bulk(ids)
+                return [recipes[pk] for pk in ids if pk in recipes]
+        return self.fallback[index]
+
+
+def fan_out(recipe_id, author_id):
+    """Push a new recipe onto the timelines of the author's followers."""
+    if store is None:
+        return
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    try:
+        store.push(followers.iterator(), recipe_id)
+    except store.errors:
+        logger.exception('Could not fan out recipe %s', recipe_id)
+
+
+def retract(recipe_id, author_id):
+    if store is None:
+        return
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    try:
+        store.remove(followers.iterator(), recipe_id)
+    except store.errors:
+        logger.exception('Could not retract recipe %s', recipe_id)
+
+
+def reset(user_id):
+    if store is None:
+        return
+    try:
+        store.clear(user_id)
+    except store.errors:
+        logger.exception('Could not reset timeline of user %s', user_id)